@@ -80,6 +80,34 @@ COPYRIGHT: (C) 2016 Brendan Harmon and the GRASS Development Team
 #% guisection: Series
 #%end
 
+#%option
+#% key: rain_threshold
+#% type: double
+#% description: Rainfall in mm at or below which consecutive records are fast-forwarded by gravitational diffusion alone
+#% label: Dry period threshold
+#% multiple: no
+#% required: no
+#% guisection: Series
+#%end
+
+#%option G_OPT_F_OUTPUT
+#% key: checkpoint
+#% description: Name of checkpoint file for resuming a series of rainfall events
+#% label: Checkpoint file
+#% required: no
+#% guisection: Series
+#%end
+
+#%option
+#% key: checkpoint_interval
+#% type: integer
+#% description: Number of rainfall records between checkpoints
+#% answer: 100
+#% multiple: no
+#% required: no
+#% guisection: Series
+#%end
+
 #%option G_OPT_R_INPUT
 #% key: k_factor
 #% description: Soil erodibility factor
@@ -328,6 +356,27 @@ COPYRIGHT: (C) 2016 Brendan Harmon and the GRASS Development Team
 #% guisection: Temporal
 #%end
 
+#%option
+#% key: output_stride
+#% type: integer
+#% description: Number of time steps between the maps written and registered in the time series
+#% label: Output stride
+#% answer: 1
+#% multiple: no
+#% required: no
+#% guisection: Temporal
+#%end
+
+#%option
+#% key: output_times
+#% type: string
+#% description: Times at which maps are written and registered, in minutes since the start or in year-month-day hour:minute:second format
+#% label: Output times
+#% multiple: yes
+#% required: no
+#% guisection: Temporal
+#%end
+
 #%option
 #% key: threads
 #% type: integer
@@ -338,6 +387,191 @@ COPYRIGHT: (C) 2016 Brendan Harmon and the GRASS Development Team
 #% guisection: Multiprocessing
 #%end
 
+#%option
+#% key: backend
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: raster
+#% options: raster,array
+#% description: Compute each step with GRASS modules or with in-memory arrays
+#% descriptions: raster;read and write rasters with GRASS modules at each step;array;keep the evolving state in memory as NumPy arrays
+#% guisection: Performance
+#%end
+
+#%option
+#% key: edges
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: center
+#% options: center,onesided,null
+#% description: Edge handling for the finite differences of the sediment flow divergence
+#% descriptions: center;replace neighbors outside the region with the center cell;onesided;use one-sided differences at the edges of the region;null;set the edges of the region to null
+#% guisection: Performance
+#%end
+
+#%option
+#% key: laplacian
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: nine_point
+#% options: five_point,nine_point
+#% description: Finite difference stencil of the laplacian for gravitational diffusion
+#% descriptions: five_point;5-point stencil of the direct neighbors;nine_point;9-point stencil of the 3x3 window as in r.slope.aspect
+#% guisection: Performance
+#%end
+
+#%option
+#% key: fill_method
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: fill_dir
+#% options: fill_dir,priority_flood
+#% description: Method for filling depressions
+#% descriptions: fill_dir;iterative filling with r.fill.dir;priority_flood;in-process priority-flood filling
+#% guisection: Performance
+#%end
+
+#%option
+#% key: fill_epsilon
+#% type: double
+#% description: Elevation increment imposed across filled flats by priority-flood filling in m
+#% label: Priority-flood epsilon
+#% answer: 0.0
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: accumulation
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: watershed
+#% options: watershed,incremental
+#% description: Method for computing flow accumulation for USPED and RUSLE
+#% descriptions: watershed;multiple flow direction accumulation with r.watershed at every step;incremental;single flow direction accumulation updated downstream of changed flow directions
+#% guisection: Performance
+#%end
+
+#%option
+#% key: register_batch
+#% type: integer
+#% description: Number of maps registered in each space time dataset per call (0 registers all maps at the end of the run)
+#% answer: 0
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: max_change
+#% type: double
+#% description: Maximum change in elevation in m per adaptive time step of USPED and RUSLE with the array backend
+#% label: Maximum change in elevation
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: tile_size
+#% type: integer
+#% description: Number of rows and columns of the tiles computed in parallel by the array backend (0 computes the whole region at once)
+#% label: Tile size
+#% answer: 0
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: run_id
+#% type: string
+#% description: Identifier of the run prepended to the names of its maps so that several runs can share a mapset
+#% label: Run identifier
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: hydrology_tolerance
+#% type: double
+#% description: Maximum change in elevation in m since the last SIMWE hydrologic simulation for which its water depth is reused instead of simulated again
+#% label: Hydrology tolerance
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: walker_error
+#% type: double
+#% description: Target relative error of the water depth and erosion-deposition of SIMWE for tuning the number of walkers at each step
+#% label: Target relative error of walkers
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: hydrology
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: modules
+#% options: modules,path_sampling,diffusive_wave
+#% description: Solver of the hydrologic and erosion-deposition simulations of SIMWE
+#% descriptions: modules;path sampling with r.sim.water and r.sim.sediment;path_sampling;in-process path sampling of walkers as NumPy arrays;diffusive_wave;deterministic diffusive wave model of the water depth with r.sim.sediment
+#% guisection: Performance
+#%end
+
+#%option
+#% key: write_queue
+#% type: integer
+#% description: Number of maps held in memory for a background writer that writes and registers them while the next step is computed (0 writes them at once)
+#% label: Write queue
+#% answer: 0
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option
+#% key: precision
+#% type: string
+#% required: no
+#% multiple: no
+#% answer: double
+#% options: double,float
+#% description: Precision of the written maps, while the evolving state is kept in double precision
+#% descriptions: double;double precision (DCELL) maps;float;single precision (FCELL) maps
+#% guisection: Performance
+#%end
+
+#%option
+#% key: quantum
+#% type: double
+#% description: Quantum of the erosion-deposition and difference maps written as integer multiples of it
+#% label: Quantum of scaled integer maps
+#% multiple: no
+#% required: no
+#% guisection: Performance
+#%end
+
+#%option G_OPT_F_OUTPUT
+#% key: profile
+#% description: Name for output file with the time spent in each stage and module per step (JSON, or CSV with a .csv extension)
+#% label: Profile file
+#% required: no
+#% guisection: Performance
+#%end
+
 #%option G_OPT_STRDS_OUTPUT
 #% key: elevation_timeseries
 #% answer: elevation_timeseries
@@ -347,28 +581,24 @@ COPYRIGHT: (C) 2016 Brendan Harmon and the GRASS Development Team
 
 #%option G_OPT_STRDS_OUTPUT
 #% key: depth_timeseries
-#% answer: depth_timeseries
 #% required: no
 #% guisection: Output
 #%end
 
 #%option G_OPT_STRDS_OUTPUT
 #% key: erdep_timeseries
-#% answer: erdep_timeseries
 #% required: no
 #% guisection: Output
 #%end
 
 #%option G_OPT_STRDS_OUTPUT
 #% key: flux_timeseries
-#% answer: flux_timeseries
 #% required: no
 #% guisection: Output
 #%end
 
 #%option G_OPT_STRDS_OUTPUT
 #% key: difference_timeseries
-#% answer: difference_timeseries
 #% required: no
 #% guisection: Output
 #%end
@@ -378,13 +608,38 @@ COPYRIGHT: (C) 2016 Brendan Harmon and the GRASS Development Team
 #% description: Fill depressions
 #%end
 
+#%flag
+#% key: r
+#% description: Resume a series of rainfall events from the checkpoint
+#% guisection: Series
+#%end
+
+import os
 import sys
 import atexit
+import collections
+import concurrent.futures
+import contextlib
 import csv
 import datetime
+import functools
+import heapq
+import json
+import math
+import re
+import multiprocessing
+import queue
+import threading
+import timeit
 import grass.script as gscript
 from grass.exceptions import CalledModuleError
 
+try:
+    import numpy as np
+    from grass.script import array as garray
+except ImportError:
+    np = None
+
 difference_colors = """\
 0% 100 0 100
 -1 magenta
@@ -415,6 +670,10 @@ erosion_colors = """\
 100% black
 """
 
+# most adaptive time steps per rainfall interval limited by the change
+# in elevation, each of which recomputes the rate of change
+max_adaptive_steps = 10
+
 
 def main():
     options, flags = gscript.parser()
@@ -423,7 +682,7 @@ def main():
     mode = options["mode"]
     precipitation = options["precipitation"]
     start = options["start"]
-    rain_intensity = options["rain_intensity"]
+    rain_intensity = float(options["rain_intensity"])
     rain_duration = options["rain_duration"]
     rain_interval = options["rain_interval"]
     temporaltype = options["temporaltype"]
@@ -469,71 +728,179 @@ def main():
     n = options["n"]
     threads = options["threads"]
     fill_depressions = flags["f"]
+    backend = options["backend"]
+    edges = options["edges"]
+    laplacian = options["laplacian"]
+    fill_method = options["fill_method"]
+    fill_epsilon = float(options["fill_epsilon"])
+    accumulation = options["accumulation"]
+    register_batch = int(options["register_batch"])
+    checkpoint = options["checkpoint"]
+    checkpoint_interval = int(options["checkpoint_interval"])
+    resume = flags["r"]
+    rain_threshold = (
+        float(options["rain_threshold"]) if options["rain_threshold"] else None
+    )
+    max_change = float(options["max_change"]) if options["max_change"] else None
+    tile_size = int(options["tile_size"])
+    run_id = options["run_id"]
+    write_queue = int(options["write_queue"])
+    output_stride = int(options["output_stride"])
+    output_times = options["output_times"]
+    precision = options["precision"]
+    quantum = float(options["quantum"]) if options["quantum"] else None
+    hydrology_tolerance = (
+        float(options["hydrology_tolerance"])
+        if options["hydrology_tolerance"]
+        else None
+    )
+    walker_error = float(options["walker_error"]) if options["walker_error"] else None
+    hydrology = options["hydrology"]
+    profile = options["profile"]
+
+    # check for the dependencies of the array backend
+    if backend == "array" and np is None:
+        gscript.fatal("The array backend requires NumPy")
+    if fill_method == "priority_flood" and np is None:
+        gscript.fatal("Priority-flood filling requires NumPy")
+    if accumulation == "incremental" and np is None:
+        gscript.fatal("Incremental flow accumulation requires NumPy")
+
+    # check for adaptive time stepping
+    if max_change is not None:
+        if max_change <= 0:
+            gscript.fatal("The maximum change in elevation must be positive")
+        if backend != "array":
+            gscript.fatal("Adaptive time stepping requires the array backend")
+        if mode == "simwe_mode":
+            gscript.fatal("Adaptive time stepping requires usped_mode or rusle_mode")
+
+    # check for warm starts of the hydrologic simulation
+    if hydrology_tolerance is not None:
+        if hydrology_tolerance < 0:
+            gscript.fatal("The hydrology tolerance must not be negative")
+        if mode != "simwe_mode":
+            gscript.fatal("Reusing the water depth requires simwe_mode")
+
+    # check for tuning the walkers
+    if walker_error is not None:
+        if walker_error <= 0:
+            gscript.fatal("The target relative error of walkers must be positive")
+        if mode != "simwe_mode":
+            gscript.fatal("Tuning the walkers requires simwe_mode")
+
+    # check for in-process hydrology
+    if hydrology != "modules":
+        if backend != "array":
+            gscript.fatal(f"The {hydrology} hydrology requires the array backend")
+        if mode != "simwe_mode":
+            gscript.fatal(f"The {hydrology} hydrology requires simwe_mode")
+
+    # check for the sediment flux, which only rusle_mode computes
+    if flux_timeseries and mode != "rusle_mode":
+        gscript.warning("The sediment flux is only computed in rusle_mode")
+        flux_timeseries = None
+
+    # check for tiles
+    if tile_size < 0:
+        gscript.fatal("The tile size must not be negative")
+    if tile_size and backend != "array":
+        gscript.fatal("Tiles require the array backend")
+
+    # check for the run identifier
+    if run_id and not re.match(r"^[A-Za-z][A-Za-z0-9_]*$", run_id):
+        gscript.fatal(
+            "The run identifier must start with a letter "
+            "and only contain letters, digits, and underscores"
+        )
+
+    # check for the output times
+    if output_stride < 1:
+        gscript.fatal("The output stride must be at least 1")
+    try:
+        output_times = sorted(
+            output_time(time, start) for time in output_times.split(",") if time
+        )
+    except ValueError:
+        gscript.fatal(f"Invalid output times {options['output_times']}")
+
+    # check for the quantum of scaled integer maps
+    if quantum is not None and quantum <= 0:
+        gscript.fatal("The quantum must be positive")
+
+    # name the temporary maps of this run
+    temporary.start(run_id)
+
+    # write and register maps in the background
+    if write_queue < 0:
+        gscript.fatal("The write queue must not be negative")
+    writer.start(write_queue)
+
+    # check for the checkpoint to resume from
+    if resume and not checkpoint:
+        gscript.fatal("Resuming a series of rainfall events requires a checkpoint")
+
+    # profile the stages and modules of each step
+    if profile:
+        profiler.start(profile)
 
     # check for alternative input parameters
     if not runoff:
-        runoff = "runoff"
-        gscript.mapcalc("runoff = {runoff_value}".format(**locals()), overwrite=True)
+        runoff = temporary.name("runoff")
+        gscript.mapcalc(f"{runoff} = {runoff_value}", overwrite=True)
 
     if not mannings:
-        mannings = "mannings"
-        gscript.mapcalc(
-            "mannings = {mannings_value}".format(**locals()), overwrite=True
-        )
+        mannings = temporary.name("mannings")
+        gscript.mapcalc(f"{mannings} = {mannings_value}", overwrite=True)
 
     if not detachment:
-        detachment = "detachment"
-        gscript.mapcalc(
-            "detachment = {detachment_value}".format(**locals()), overwrite=True
-        )
+        detachment = temporary.name("detachment")
+        gscript.mapcalc(f"{detachment} = {detachment_value}", overwrite=True)
 
     if not transport:
-        transport = "transport"
-        gscript.mapcalc(
-            "transport = {transport_value}".format(**locals()), overwrite=True
-        )
+        transport = temporary.name("transport")
+        gscript.mapcalc(f"{transport} = {transport_value}", overwrite=True)
 
     if not shearstress:
-        shearstress = "shearstress"
-        gscript.mapcalc(
-            "shearstress = {shearstress_value}".format(**locals()), overwrite=True
-        )
+        shearstress = temporary.name("shearstress")
+        gscript.mapcalc(f"{shearstress} = {shearstress_value}", overwrite=True)
 
     if not mass:
-        mass = "mass"
-        gscript.mapcalc("mass = {mass_value}".format(**locals()), overwrite=True)
+        mass = temporary.name("mass")
+        gscript.mapcalc(f"{mass} = {mass_value}", overwrite=True)
 
-    density = "density"
+    density = temporary.name("density")
     if density_raster:
         # convert g/cm^3 to kg/m^3
-        gscript.mapcalc(
-            "density = {density_raster} * 1000".format(**locals()), overwrite=True
-        )
+        gscript.mapcalc(f"{density} = {density_raster} * 1000", overwrite=True)
     else:
         # convert g/cm^3 to kg/m^3
-        gscript.mapcalc(
-            "density = {density_value} * 1000".format(**locals()), overwrite=True
-        )
+        gscript.mapcalc(f"{density} = {density_value} * 1000", overwrite=True)
 
     if not c_factor:
-        c_factor = "c_factor"
-        gscript.mapcalc(
-            "c_factor = {c_factor_value}".format(**locals()), overwrite=True
-        )
+        c_factor = temporary.name("c_factor")
+        gscript.mapcalc(f"{c_factor} = {c_factor_value}", overwrite=True)
 
     if not k_factor:
-        k_factor = "k_factor"
-        gscript.mapcalc(
-            "k_factor = {k_factor_value}".format(**locals()), overwrite=True
-        )
+        k_factor = temporary.name("k_factor")
+        gscript.mapcalc(f"{k_factor} = {k_factor_value}", overwrite=True)
 
-    # copy the elevation raster if it is not in the current mapset
+    # link the elevation raster if it is not in the current mapset
+    # as a virtual raster that reads the cells of the original map
+    # so that it can be registered without copying it
     name = elevation.split("@")[0]
     filename = gscript.read_command(
         "g.list", type="raster", pattern=name, mapset=".", flags="m"
     )
     if not filename:
-        gscript.run_command("g.copy", raster=f"{elevation},{name}", overwrite=True)
+        if run_id:
+            name = f"{run_id}_{name}"
+        try:
+            gscript.run_command(
+                "r.buildvrt", input=elevation, output=name, overwrite=True
+            )
+        except (CalledModuleError, OSError):
+            gscript.run_command("g.copy", raster=f"{elevation},{name}", overwrite=True)
         elevation = name
 
     # create dynamic evolution object
@@ -578,6 +945,27 @@ def main():
         n=n,
         threads=threads,
         fill_depressions=fill_depressions,
+        backend=backend,
+        edges=edges,
+        laplacian=laplacian,
+        fill_method=fill_method,
+        fill_epsilon=fill_epsilon,
+        accumulation=accumulation,
+        register_batch=register_batch,
+        checkpoint=checkpoint,
+        checkpoint_interval=checkpoint_interval,
+        resume=resume,
+        rain_threshold=rain_threshold,
+        max_change=max_change,
+        tile_size=tile_size,
+        run_id=run_id,
+        output_stride=output_stride,
+        output_times=output_times,
+        precision=precision,
+        quantum=quantum,
+        hydrology_tolerance=hydrology_tolerance,
+        walker_error=walker_error,
+        hydrology=hydrology,
     )
 
     # determine type of model and run
@@ -587,10 +975,378 @@ def main():
     if runs == "event":
         elevation = dynamics.rainfall_event()
 
+    # wait for the maps written in the background
+    writer.stop()
+
+    # write the profile
+    if profile:
+        profiler.write()
+
     atexit.register(cleanup)
     sys.exit(0)
 
 
+class Profiler:
+    """time the stages of each step and the modules that they run
+    and report the wall time, module calls and bytes written per step"""
+
+    def __init__(self):
+        self.output = None
+        self.mapset = None
+        self.steps = []
+        self.current = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @property
+    def stack(self):
+        """stages nested in the stage being profiled by this thread"""
+
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+
+        return self.local.stack
+
+    def start(self, output):
+        """start profiling by timing every module run through grass.script
+        and the modules that read and write numpy arrays"""
+
+        self.output = output
+        env = gscript.gisenv()
+        self.mapset = os.path.join(env["GISDBASE"], env["LOCATION_NAME"], env["MAPSET"])
+        for name in ["run_command", "read_command", "write_command", "parse_command"]:
+            setattr(gscript, name, self.wrap(getattr(gscript, name)))
+        gscript.mapcalc = self.wrap(
+            gscript.mapcalc, "r.mapcalc", lambda args, kwargs: [args[0].split("=")[0]]
+        )
+        if np is not None:
+            garray.array.read = self.wrap(
+                garray.array.read, "r.out.bin", lambda args, kwargs: []
+            )
+            garray.array.write = self.wrap(
+                garray.array.write, "r.in.bin", lambda args, kwargs: [args[1]]
+            )
+
+    def wrap(self, function, module=None, outputs=None):
+        """count the calls, time and bytes written of the modules
+        run by a function, named by the module or else by the first argument"""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            name = module or args[0]
+            step = self.owner()
+            start = timeit.default_timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = timeit.default_timer() - start
+                if step is not None:
+                    # measure the maps written by the module
+                    size = sum(
+                        map_bytes(self.mapset, raster)
+                        for raster in (outputs or module_outputs)(args, kwargs)
+                    )
+                    with self.lock:
+                        calls, total = step["modules"].get(name, (0, 0.0))
+                        step["modules"][name] = (calls + 1, total + seconds)
+                        step["bytes"] += size
+
+        return wrapper
+
+    def owner(self):
+        """step that the modules run by this thread are charged to,
+        which for the background writer is the step that submitted them"""
+
+        step = getattr(self.local, "step", None)
+        if step is not None:
+            return step
+        with self.lock:
+            return self.current
+
+    @contextlib.contextmanager
+    def charge(self, step):
+        """charge the modules run by this thread to a step"""
+
+        self.local.step = step
+        try:
+            yield
+        finally:
+            self.local.step = None
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """profile a time step"""
+
+        if self.output is None:
+            yield
+            return
+        current = {
+            "step": name,
+            "stages": collections.defaultdict(float),
+            "modules": {},
+            "bytes": 0,
+        }
+        with self.lock:
+            self.current = current
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            current["seconds"] = timeit.default_timer() - start
+            with self.lock:
+                self.steps.append(current)
+                self.current = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """profile the time spent in a stage of a step
+        excluding the time spent in the stages nested in it"""
+
+        step = self.owner()
+        if step is None:
+            yield
+            return
+        self.stack.append(0.0)
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            seconds = timeit.default_timer() - start
+            with self.lock:
+                step["stages"][name] += seconds - self.stack[-1]
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1] += seconds
+
+    def write(self):
+        """write the profile as json or as csv"""
+
+        if self.output.lower().endswith(".csv"):
+            with open(self.output, "w", newline="") as output:
+                writer = csv.writer(output)
+                writer.writerow(["step", "type", "name", "calls", "seconds", "bytes"])
+                for step in self.steps:
+                    writer.writerow(
+                        [
+                            step["step"],
+                            "step",
+                            "",
+                            sum(calls for calls, _ in step["modules"].values()),
+                            step["seconds"],
+                            step["bytes"],
+                        ]
+                    )
+                    for name, seconds in step["stages"].items():
+                        writer.writerow([step["step"], "stage", name, "", seconds, ""])
+                    for name, (calls, seconds) in step["modules"].items():
+                        writer.writerow(
+                            [step["step"], "module", name, calls, seconds, ""]
+                        )
+        else:
+            with open(self.output, "w") as output:
+                json.dump(
+                    [
+                        {
+                            "step": step["step"],
+                            "seconds": step["seconds"],
+                            "bytes": step["bytes"],
+                            "stages": step["stages"],
+                            "modules": {
+                                name: {"calls": calls, "seconds": seconds}
+                                for name, (calls, seconds) in step["modules"].items()
+                            },
+                        }
+                        for step in self.steps
+                    ],
+                    output,
+                    indent=2,
+                )
+
+
+def profiled(stage):
+    """decorate a method to profile it as a stage of a step"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler.stage(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def module_outputs(args, kwargs):
+    """names of the raster maps written by a module
+    from the parameters of the modules run by the model"""
+
+    rasters = [
+        kwargs[key]
+        for key in [
+            "output",
+            "slope",
+            "aspect",
+            "dx",
+            "dy",
+            "depth",
+            "accumulation",
+            "direction",
+            "areas",
+            "erosion_deposition",
+            "sediment_flux",
+        ]
+        if kwargs.get(key)
+    ]
+
+    # copied or renamed maps
+    if args and args[0] in ["g.copy", "g.rename"]:
+        names = kwargs["raster"]
+        if isinstance(names, str):
+            names = names.split(",")
+        rasters.append(names[1])
+
+    return rasters
+
+
+def map_bytes(mapset, raster):
+    """size in bytes of the files of a raster map in a mapset"""
+
+    name = raster.strip().split("@")[0]
+    paths = [
+        os.path.join(mapset, element, name)
+        for element in ["cell", "fcell", "cellhd", "colr", "hist", "cats"]
+    ]
+    misc = os.path.join(mapset, "cell_misc", name)
+    if os.path.isdir(misc):
+        paths.extend(os.path.join(misc, file) for file in os.listdir(misc))
+
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+profiler = Profiler()
+
+
+class TemporaryMaps:
+    """run-scoped names of the temporary maps of a run,
+    prefixed with the identifier of the run
+    so that several runs can share a mapset,
+    and registered so that cleanup only removes the maps of this run"""
+
+    def __init__(self):
+        self.names = set()
+        self.start()
+
+    def start(self, run_id=None):
+        """prefix the temporary maps with the identifier of the run
+        or with the process id"""
+
+        self.prefix = f"tmp_{run_id or os.getpid()}_"
+
+    def name(self, name):
+        """run-scoped name of a temporary map"""
+
+        scoped = self.prefix + name
+        self.names.add(scoped)
+
+        return scoped
+
+
+temporary = TemporaryMaps()
+
+
+class Writer:
+    """write maps, set their color tables and timestamps, and register them
+    in a background thread while the next time step is computed,
+    with at most a number of maps waiting in memory to be written"""
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.error = None
+        self.slots = None
+
+    def start(self, size):
+        """start a background writer that holds a number of maps in memory
+        or run each task at once without a writer"""
+
+        if not size:
+            return
+        self.queue = queue.Queue()
+        self.slots = threading.Semaphore(size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, **kwargs):
+        """run a task in the background, waiting while the maps in memory
+        fill the queue if the task writes an array, or at once without a writer"""
+
+        if self.queue is None:
+            return function(*args, **kwargs)
+        self.check()
+
+        # only the tasks that hold arrays count against the size of the queue
+        held = np is not None and any(
+            isinstance(arg, np.ndarray) for arg in args + tuple(kwargs.values())
+        )
+        if held:
+            self.slots.acquire()
+
+        # charge the task to the step that submitted it
+        self.queue.put(
+            (functools.partial(function, *args, **kwargs), held, profiler.owner())
+        )
+
+    def run(self):
+        """run the queued tasks in order,
+        skipping the remaining tasks after an error"""
+
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                function, held, step = task
+                try:
+                    if self.error is None:
+                        with profiler.charge(step):
+                            function()
+                finally:
+                    if held:
+                        self.slots.release()
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        """raise the error of a background task"""
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def wait(self):
+        """wait for the queued tasks, such as the maps read by modules"""
+
+        if self.queue is not None:
+            self.queue.join()
+        self.check()
+
+    def stop(self):
+        """wait for the queued tasks and stop the background writer"""
+
+        if self.queue is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.queue = None
+        self.check()
+
+
+writer = Writer()
+
+
 class Evolution:
     def __init__(
         self,
@@ -617,6 +1373,20 @@ class Evolution:
         n,
         threads,
         fill_depressions,
+        edges,
+        laplacian,
+        fill_method,
+        fill_epsilon,
+        accumulation,
+        outputs,
+        max_change,
+        tile_size,
+        run_id,
+        precision,
+        quantum,
+        hydrology_tolerance,
+        walker_error,
+        hydrology,
     ):
         self.elevation = elevation
         self.precipitation = precipitation
@@ -641,6 +1411,40 @@ class Evolution:
         self.n = n
         self.threads = threads
         self.fill_depressions = fill_depressions
+        self.edges = edges
+        self.laplacian = laplacian
+        self.fill_method = fill_method
+        self.fill_epsilon = fill_epsilon
+        self.accumulation = accumulation
+        self.outputs = outputs
+        self.max_change = max_change
+        self.tile_size = tile_size
+        self.run_id = run_id
+        self.precision = precision
+        self.quantum = quantum
+        self.hydrology_tolerance = hydrology_tolerance
+        self.walker_error = walker_error
+        self.hydrology = hydrology
+        self.flow_engine = None
+
+        # elevation, rainfall, and water depth of the last hydrologic simulation
+        self.last_hydrology = None
+
+        # rainfall rate (mm/hr) and water depth of the previous step
+        # added to the rainfall of the next hydrologic simulation
+        self.rainfall = None
+        self.carried_depth = None
+
+        # seed and relative errors of the half-samples of the walkers
+        self.seed = 0
+        self.errors = []
+
+        # write the maps of the next step or keep them temporary
+        self.persist = True
+
+        # elevation of the last registered step
+        # that the change in elevation is computed from
+        self.registered_elevation = self.elevation
 
     def parse_time(self):
         """parse, advance, and stamp time"""
@@ -678,6 +1482,38 @@ class Evolution:
             ":", "_"
         )
 
+        # prefix the maps with the identifier of the run
+        if self.run_id:
+            evolved_elevation = f"{self.run_id}_{evolved_elevation}"
+            depth = f"{self.run_id}_{depth}"
+            sediment_flux = f"{self.run_id}_{sediment_flux}"
+            erosion_deposition = f"{self.run_id}_{erosion_deposition}"
+            difference = f"{self.run_id}_{difference}"
+
+        # only stamp the maps of requested outputs
+        # and keep the depth of the last step for the next step
+        if "depth" not in self.outputs:
+            depth = temporary.name("depth")
+        if "sediment_flux" not in self.outputs:
+            sediment_flux = None
+        if "erosion_deposition" not in self.outputs:
+            erosion_deposition = None
+        if "difference" not in self.outputs:
+            difference = None
+
+        # keep the maps of the steps between outputs temporary,
+        # alternating the elevation with the elevation it evolves from
+        if not self.persist:
+            elevations = [temporary.name("elevation_a"), temporary.name("elevation_b")]
+            if self.elevation == elevations[0]:
+                evolved_elevation = elevations[1]
+            else:
+                evolved_elevation = elevations[0]
+            depth = temporary.name("depth")
+            sediment_flux = None
+            erosion_deposition = None
+            difference = None
+
         return (
             evolved_elevation,
             time,
@@ -687,13 +1523,14 @@ class Evolution:
             difference,
         )
 
+    @profiled("slope")
     def compute_slope(self):
         """compute slope and partial derivatives"""
 
         # assign variables
-        slope = "slope"
-        dx = "dx"
-        dy = "dy"
+        slope = temporary.name("slope")
+        dx = temporary.name("dx")
+        dy = temporary.name("dy")
 
         # compute slope and partial derivatives
         gscript.run_command(
@@ -708,19 +1545,25 @@ class Evolution:
 
         return slope, dx, dy
 
+    @profiled("hydrology")
     def simwe(self, dx, dy, depth):
         """hydrologic simulation using a monte carlo path sampling method
         to solve the shallow water flow equations"""
 
+        # reuse the water depth of the last hydrologic simulation
+        if self.warm_start(depth):
+            return depth
+
         # assign variable
-        rain = "rain"
+        rain = temporary.name("rain")
 
         # hydrology parameters
         gscript.mapcalc(f"{rain} = {self.rain_intensity}*{self.runoff}", overwrite=True)
 
         # hydrologic simulation
-        gscript.run_command(
+        self.walker_sample(
             "r.sim.water",
+            "depth",
             elevation=self.elevation,
             dx=dx,
             dy=dy,
@@ -728,139 +1571,268 @@ class Evolution:
             man=self.mannings,
             depth=depth,
             niterations=self.rain_interval,
-            nwalkers=self.walkers,
             nprocs=self.threads,
             overwrite=True,
         )
 
         # remove temporary maps
-        gscript.run_command("g.remove", type="raster", name=["rain"], flags="f")
+        gscript.run_command("g.remove", type="raster", name=[rain], flags="f")
+
+        # keep the state of the hydrologic simulation for warm starts
+        if self.hydrology_tolerance is not None:
+            self.last_hydrology = (
+                self.hydrology_elevation(),
+                self.rainfall,
+                depth,
+            )
 
         return depth
 
-    def event_based_r_factor(self):
-        """compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1)"""
+    def walker_sample(self, module, output, **kwargs):
+        """run a path sampling module with the walkers of the step
+        or, when tuning the walkers, as two independent half-samples
+        with different seeds whose mean is the output
+        and whose difference estimates its relative error"""
+
+        if not self.walker_error:
+            gscript.run_command(module, nwalkers=self.walkers, **kwargs)
+            return
+
+        halves = [temporary.name(f"{output}_a"), temporary.name(f"{output}_b")]
+        for half in halves:
+            self.seed = self.seed + 1
+            gscript.run_command(
+                module,
+                nwalkers=max(1, int(self.walkers) // 2),
+                random_seed=self.seed,
+                **{**kwargs, output: half},
+            )
+        self.errors.append(self.average_samples(halves, kwargs[output]))
+
+    def average_samples(self, halves, output):
+        """average two half-samples and estimate the relative error
+        of their mean from their difference"""
+
         # assign variables
-        rain_energy = "rain_energy"
-        rain_volume = "rain_volume"
-        erosivity = "erosivity"
-        r_factor = "r_factor"
+        a, b = halves
+        squares = temporary.name("squares")
 
-        # derive rainfall energy (MJ ha^-1 mm^-1)
-        gscript.mapcalc(
-            f"{rain_energy}" f"=0.29*(1.-(0.72*exp(-0.05*{self.rain_intensity})))",
-            overwrite=True,
+        # average the half-samples
+        gscript.mapcalc(f"{output} = ({a}+{b})/2.", overwrite=True)
+
+        # sum the squares of their difference and their sum
+        sums = []
+        for expression in [f"({a}-{b})^2", f"({a}+{b})^2"]:
+            gscript.mapcalc(f"{squares} = {expression}", overwrite=True)
+            univar = gscript.parse_command("r.univar", map=squares, flags="g")
+            sums.append(float(univar["sum"]))
+
+        # remove temporary maps
+        gscript.run_command("g.remove", type="raster", name=[a, b, squares], flags="f")
+
+        return math.sqrt(sums[0] / sums[1]) if sums[1] else None
+
+    def tune_walkers(self):
+        """adjust the walkers of the next step to the target relative error
+        from the largest relative error of the step,
+        since the error of path sampling falls
+        with the square root of the number of walkers"""
+
+        errors = [error for error in self.errors if error is not None]
+        self.errors = []
+        if not errors:
+            return
+        error = max(errors)
+
+        # change the walkers by at most a factor of 4 per step
+        # since the estimated error is itself noisy
+        factor = min(max((error / self.walker_error) ** 2, 0.25), 4.0)
+        self.walkers = int(min(max(int(self.walkers) * factor, 1000), 7000000))
+        gscript.message(
+            f"Relative error {error:.4f} at {self.start}, "
+            f"{self.walkers} walkers for the next step"
         )
 
-        # derive rainfall volume
-        """
-        rainfall volume (mm)
-        = rainfall intensity (mm/hr)
-        * (rainfall interval (min)
-        * (1 hr / 60 min))
-        """
-        gscript.mapcalc(
-            f"{rain_volume}"
-            f"= {self.rain_intensity}"
-            f"*({self.rain_interval}"
-            f"/60.)",
-            overwrite=True,
-        )
+    def warm_start(self, depth):
+        """reuse the water depth of the last hydrologic simulation
+        as the water depth of this step while the rainfall is the same
+        and the elevation has changed by no more than the tolerance,
+        or else add the water depth of the previous step
+        to the rainfall of a new simulation"""
+
+        if self.hydrology_tolerance is None:
+            return False
+        self.rainfall = self.rain_intensity
+        if self.last_hydrology is not None:
+            elevation, rainfall, simulated = self.last_hydrology
+            if (
+                rainfall == self.rainfall
+                and self.elevation_change(elevation) <= self.hydrology_tolerance
+            ):
+                if simulated != depth:
+                    self.save_depth(simulated, depth)
+                return True
+
+        # derive excess water (mm/hr) from rainfall rate (mm/hr)
+        # plus the depth (m) per rainfall interval (min)
+        if self.carried_depth is not None:
+            self.rain_intensity = self.excess_rainfall(
+                self.rainfall, self.carried_depth
+            )
 
-        # derive event erosivity index (MJ mm ha^-1 hr^-1)
-        gscript.mapcalc(
-            f"{erosivity}"
-            f"=({rain_energy}"
-            f"*{rain_volume})"
-            f"*{self.rain_intensity}"
-            f"*1.",
-            overwrite=True,
+        return False
+
+    def hydrology_elevation(self):
+        """keep the elevation of a hydrologic simulation"""
+
+        elevation = temporary.name("hydrology_elevation")
+        gscript.run_command(
+            "g.copy", raster=[self.elevation, elevation], overwrite=True
         )
 
-        # derive R factor (MJ mm ha^-1 hr^-1 yr^1)
+        return elevation
+
+    def elevation_change(self, elevation):
+        """maximum change in elevation (m) since an elevation"""
+
+        change = temporary.name("elevation_change")
+        gscript.mapcalc(f"{change} = abs({self.elevation}-{elevation})", overwrite=True)
+        univar = gscript.parse_command("r.univar", map=change, flags="g")
+
+        return float(univar["max"])
+
+    @profiled("erosivity")
+    def event_based_r_factor(self):
+        """compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1)"""
+
+        # compute a scalar R factor from the rainfall rate,
+        # leaving out the water depth of the previous step
+        rainfall = self.rain_intensity
+        if not isinstance(rainfall, (int, float)):
+            rainfall = self.rainfall
+        if isinstance(rainfall, (int, float)):
+            return uniform_r_factor(rainfall, self.rain_interval)
+
+        # assign variables
+        r_factor = temporary.name("r_factor")
+
+        # derive R factor (MJ mm ha^-1 hr^-1 yr^1) in a single pass
         """
+        rainfall energy (MJ ha^-1 mm^-1)
+        = 0.29 * (1 - 0.72 * exp(-0.05 * rainfall intensity (mm/hr)))
+
+        rainfall volume (mm)
+        = rainfall intensity (mm/hr)
+        * (rainfall interval (min)
+        * (1 hr / 60 min))
+
+        EI (MJ mm ha^-1 hr^-1)
+        = rainfall energy * rainfall volume * rainfall intensity
+
         R factor (MJ mm ha^-1 hr^-1 yr^1)
         = EI (MJ mm ha^-1 hr^-1)
         / (rainfall interval (min)
         * (1 yr / 525600 min))
         """
         gscript.mapcalc(
-            f"{r_factor}" f"={erosivity}" f"/({self.rain_interval}" f"/525600.)",
+            f"{r_factor}"
+            f"=0.29*(1.-(0.72*exp(-0.05*{self.rain_intensity})))"
+            f"*({self.rain_intensity}*({self.rain_interval}/60.))"
+            f"*{self.rain_intensity}"
+            f"/({self.rain_interval}/525600.)",
             overwrite=True,
         )
 
-        # remove temporary maps
-        gscript.run_command(
-            "g.remove",
-            type="raster",
-            name=["rain_energy", "rain_volume", "erosivity"],
-            flags="f",
-        )
-
         return r_factor
 
-    def gravitational_diffusion(self, evolved_elevation):
-        """settling of sediment due to gravitational diffusion"""
+    @profiled("accumulation")
+    def flow_accumulation(self):
+        """compute flow accumulation from the current elevation"""
 
         # assign variables
-        dxx = "dxx"
-        dyy = "dyy"
-        divergence = "divergence"
-        settled_elevation = "settled_elevation"
+        flowacc = temporary.name("flowacc")
 
-        # compute second order partial derivatives of evolved elevation
+        # update flow accumulation downstream of changed flow directions
+        if self.accumulation == "incremental":
+            if self.flow_engine is None:
+                region = gscript.region()
+                self.flow_engine = FlowAccumulation(region["ewres"], region["nsres"])
+            write_array(self.flow_engine.update(read_array(self.elevation)), flowacc)
+            return flowacc
+
+        # compute flow accumulation
         gscript.run_command(
-            "r.slope.aspect",
-            elevation=evolved_elevation,
-            dxx=dxx,
-            dyy=dyy,
-            flags="e",
+            "r.watershed",
+            elevation=self.elevation,
+            accumulation=flowacc,
+            flags="a",
             overwrite=True,
         )
 
+        return flowacc
+
+    @profiled("diffusion")
+    def gravitational_diffusion(self, evolved_elevation):
+        """settling of sediment due to gravitational diffusion"""
+
+        # skip settling without gravitational diffusion
+        if float(self.grav_diffusion) == 0:
+            gscript.run_command("r.colors", map=evolved_elevation, color="elevation")
+            return evolved_elevation
+
+        # assign variables
+        settled_elevation = temporary.name("settled_elevation")
+
         # compute the laplacian (m^-1)
         # i.e. the divergence of the elevation gradient
-        # from the sum of the second order derivatives of elevation
-        gscript.mapcalc(f"{divergence} = {dxx}+{dyy}", overwrite=True)
+        # from a finite difference stencil of the neighboring cells
+        laplacian = laplacian_expression(evolved_elevation, self.laplacian)
 
         # compute settling caused by gravitational diffusion
         """
         change in elevation (m)
         = elevation (m)
-        - (change in time (s)
+        + (change in time (s)
         / sediment mass density (kg/m^3)
         * gravitational diffusion coefficient (m^2/s)
-        * divergence (m^-1))
+        * laplacian (m^-1))
         """
         gscript.mapcalc(
             f"{settled_elevation}"
             f"={evolved_elevation}"
-            f"-({self.rain_interval}*60"
+            f"+({self.rain_interval}*60"
             f"/{self.density}"
             f"*{self.grav_diffusion}"
-            f"*{divergence})",
+            f"*({laplacian}))",
             overwrite=True,
         )
-        # update elevation
-        gscript.mapcalc(f"{evolved_elevation} = {settled_elevation}", overwrite=True)
-        gscript.run_command("r.colors", map=evolved_elevation, color="elevation")
 
-        # remove temporary maps
+        # update elevation
         gscript.run_command(
-            "g.remove",
-            type="raster",
-            name=["settled_elevation", "divergence", "dxx", "dyy"],
-            flags="f",
+            "g.rename",
+            raster=f"{settled_elevation},{evolved_elevation}",
+            overwrite=True,
         )
+        gscript.run_command("r.colors", map=evolved_elevation, color="elevation")
 
         return evolved_elevation
 
+    @profiled("filling")
     def fill_sinks(self, evolved_elevation):
         """fill sinks in digital elevation model"""
 
+        # fill sinks in memory
+        if self.fill_method == "priority_flood":
+            write_array(
+                priority_flood(read_array(evolved_elevation), self.fill_epsilon),
+                evolved_elevation,
+                color="elevation",
+            )
+            return evolved_elevation
+
         # assign variables
-        depressionless_elevation = "depressionless_elevation"
-        direction = "flow_direction"
+        depressionless_elevation = temporary.name("depressionless_elevation")
+        direction = temporary.name("flow_direction")
 
         # fill sinks
         gscript.run_command(
@@ -881,28 +1853,170 @@ class Evolution:
         gscript.run_command(
             "g.remove",
             type="raster",
-            name=["depressionless_elevation", "flow_direction"],
+            name=[depressionless_elevation, direction],
             flags="f",
         )
 
         return evolved_elevation
 
+    def stored(self, expression, scaled=False):
+        """map algebra expression of an output map in single
+        or double precision or scaled by the quantum as integers"""
+
+        if scaled and self.quantum:
+            return f"round(({expression})/{self.quantum})"
+        if self.precision == "float":
+            return f"float({expression})"
+
+        return expression
+
+    @profiled("difference")
     def compute_difference(self, evolved_elevation, difference):
-        """compute the change in elevation"""
+        """compute the change in elevation since the last registered step"""
+
+        registered = self.registered_elevation
+        if self.persist:
+            self.registered_elevation = evolved_elevation
+        if not difference:
+            return None
 
         gscript.mapcalc(
-            f"{difference} = {evolved_elevation}-{self.elevation}", overwrite=True
+            f"{difference} = "
+            f"{self.stored(f'{evolved_elevation}-{registered}', scaled=True)}",
+            overwrite=True,
+        )
+        writer.submit(
+            gscript.run_command, "r.colors", map=difference, color="differences"
         )
-        gscript.run_command("r.colors", map=difference, color="differences")
 
         return difference
 
+    def sediment_divergence(self, sediment_flux, aspect, erdep):
+        """compute net erosion-deposition (kg/m^2s) as the divergence
+        of the sediment flow field in a single pass
+        using central differences of the neighboring cells"""
+
+        def flow(row, col, direction):
+            # sediment flow rate in x (cos) or y (sin) direction (m^2/s)
+            return f"{sediment_flux}[{row},{col}]*{direction}({aspect}[{row},{col}])"
+
+        def neighbor(row, col, direction):
+            # replace neighbors outside the region or null with the center cell
+            return (
+                f"if(isnull({flow(row, col, direction)}),"
+                f"{flow(0, 0, direction)},"
+                f"{flow(row, col, direction)})"
+            )
+
+        # compute change in sediment flow in x and y directions
+        # as partial derivatives of sediment flow field
+        qsxdx = f"({neighbor(0, 1, 'cos')}-{neighbor(0, -1, 'cos')})/(2.*ewres())"
+        qsydy = f"({neighbor(-1, 0, 'sin')}-{neighbor(1, 0, 'sin')})/(2.*nsres())"
+
+        # handle the edges of the region
+        if self.edges == "onesided":
+            qsxdx = f"if(col()==1||col()==ncols(),2.,1.)*{qsxdx}"
+            qsydy = f"if(row()==1||row()==nrows(),2.,1.)*{qsydy}"
+        divergence = f"{qsxdx}+{qsydy}"
+        if self.edges == "null":
+            divergence = (
+                f"if(row()==1||row()==nrows()||col()==1||col()==ncols(),"
+                f"null(),"
+                f"{divergence})"
+            )
+
+        # compute net erosion-deposition (kg/m^2s)
+        gscript.mapcalc(f"{erdep}={divergence}", overwrite=True)
+
+        return erdep
+
+    @profiled("rainfall")
+    def excess_rainfall(self, rain_intensity, depth):
+        """derive excess water (mm/hr) from rainfall rate (mm/hr)
+        plus the depth (m) per rainfall interval (min)"""
+
+        # assign variables
+        self.rainfall = rain_intensity
+        rain_excess = temporary.name("rain_excess")
+        evolved_intensity = temporary.name("rain_intensity")
+
+        # derive excess water
+        gscript.mapcalc(
+            f"{rain_excess}"
+            f"={rain_intensity}"
+            f"+{depth}"
+            f"/1000."
+            f"/{self.rain_interval}"
+            f"*60.",
+            overwrite=True,
+        )
+
+        # update excess rainfall
+        gscript.mapcalc(f"{evolved_intensity} = {rain_excess}", overwrite=True)
+
+        # remove temporary maps
+        gscript.run_command("g.remove", type="raster", name=[rain_excess], flags="f")
+
+        return evolved_intensity
+
+    def dry_period(self, duration):
+        """evolve the landscape by gravitational diffusion alone
+        over a dry period (min)"""
+
+        # advance time over the dry period
+        rain_interval = self.rain_interval
+        self.rain_interval = duration
+        (
+            evolved_elevation,
+            time,
+            depth,
+            sediment_flux,
+            erosion_deposition,
+            difference,
+        ) = self.parse_time()
+
+        # gravitational diffusion in stable substeps
+        substeps = 1
+        if float(self.grav_diffusion) != 0:
+            region = gscript.region()
+            substeps = diffusion_substeps(
+                duration,
+                float(self.grav_diffusion),
+                float(gscript.raster_info(self.density)["min"]),
+                region["ewres"],
+                region["nsres"],
+            )
+        self.rain_interval = duration / substeps
+        gscript.mapcalc(f"{evolved_elevation}={self.elevation}", overwrite=True)
+        for substep in range(substeps):
+            evolved_elevation = self.gravitational_diffusion(evolved_elevation)
+        self.rain_interval = rain_interval
+        self.last_hydrology = None
+
+        # compute elevation change
+        difference = self.compute_difference(evolved_elevation, difference)
+
+        return evolved_elevation, time, difference
+
+    def save_depth(self, depth, saved_depth):
+        """save the depth carried over to the next step"""
+
+        gscript.run_command("g.copy", raster=[depth, saved_depth], overwrite=True)
+
+        return saved_depth
+
+    def load_depth(self, depth):
+        """load the depth carried over to the next step"""
+
+        return depth
+
+    @profiled("sediment")
     def erosion_deposition(self):
         """a process-based landscape evolution model using simulated
         erosion and deposition to evolve a digital elevation model"""
 
         # assign variables
-        erdep = "erdep"  # kg/m^2s
+        erdep = temporary.name("erdep")  # kg/m^2s
 
         # parse, advance, and stamp time
         (
@@ -921,8 +2035,9 @@ class Evolution:
         depth = self.simwe(dx, dy, depth)
 
         # erosion-deposition simulation
-        gscript.run_command(
+        self.walker_sample(
             "r.sim.sediment",
+            "erosion_deposition",
             elevation=self.elevation,
             water_depth=depth,
             dx=dx,
@@ -933,20 +2048,33 @@ class Evolution:
             man=self.mannings,
             erosion_deposition=erdep,
             niterations=self.rain_interval,
-            nwalkers=self.walkers,
             nprocs=self.threads,
             overwrite=True,
         )
 
+        # tune the walkers of the next step
+        if self.walker_error:
+            self.tune_walkers()
+
         # filter outliers
-        gscript.mapcalc(
-            f"{erosion_deposition}"
-            f"=if({erdep}<{self.erdepmin},"
+        filtered = (
+            f"if({erdep}<{self.erdepmin},"
             f"{self.erdepmin},"
-            f"if({erdep}>{self.erdepmax},{self.erdepmax},{erdep}))",
-            overwrite=True,
+            f"if({erdep}>{self.erdepmax},{self.erdepmax},{erdep}))"
         )
-        gscript.run_command("r.colors", map=erosion_deposition, raster=erdep)
+        if erosion_deposition:
+            stored = self.stored(filtered, scaled=True)
+            gscript.mapcalc(f"{erosion_deposition}={stored}", overwrite=True)
+            if self.quantum:
+                gscript.run_command(
+                    "r.colors", map=erosion_deposition, color="differences"
+                )
+            else:
+                gscript.run_command("r.colors", map=erosion_deposition, raster=erdep)
+
+            # reuse the map unless it is stored at a lower precision
+            if stored == filtered:
+                filtered = erosion_deposition
 
         # evolve landscape
         """
@@ -959,7 +2087,7 @@ class Evolution:
             f"{evolved_elevation}"
             f"={self.elevation}"
             f"+({self.rain_interval}*60"
-            f"*{erosion_deposition}"
+            f"*{filtered}"
             f"/{self.density})",
             overwrite=True,
         )
@@ -975,28 +2103,23 @@ class Evolution:
         difference = self.compute_difference(evolved_elevation, difference)
 
         # remove temporary maps
-        gscript.run_command(
-            "g.remove", type="raster", name=["erdep", "dx", "dy"], flags="f"
-        )
+        gscript.run_command("g.remove", type="raster", name=[erdep, dx, dy], flags="f")
 
         return (evolved_elevation, time, depth, erosion_deposition, difference)
 
+    @profiled("sediment")
     def usped(self):
         """a transport limited landscape evolution model
         using the USPED (Unit Stream Power Based Model) model to evolve
         a digital elevation model"""
 
         # assign variables
-        ls_factor = "ls_factor"
-        slope = "slope"
-        aspect = "aspect"
-        flowacc = "flowacc"
-        qsx = "qsx"
-        qsxdx = "qsxdx"
-        qsy = "qsy"
-        qsydy = "qsydy"
-        erdep = "erdep"  # kg/m^2s
-        sedflow = "sedflow"
+        ls_factor = temporary.name("ls_factor")
+        slope = temporary.name("slope")
+        aspect = temporary.name("aspect")
+        flowacc = temporary.name("flowacc")
+        erdep = temporary.name("erdep")  # kg/m^2s
+        sedflow = temporary.name("sedflow")
 
         # parse, advance, and stamp time
         (
@@ -1008,6 +2131,10 @@ class Evolution:
             difference,
         ) = self.parse_time()
 
+        # keep the sediment flow in a temporary map
+        # since the flux is only registered by rusle_mode
+        sedflux = temporary.name("flux")
+
         # compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1 yr^-1)
         r_factor = self.event_based_r_factor()
 
@@ -1022,22 +2149,25 @@ class Evolution:
         )
 
         # compute flow accumulation
-        gscript.run_command(
-            "r.watershed",
-            elevation=self.elevation,
-            accumulation=flowacc,
-            flags="a",
-            overwrite=True,
-        )
+        flowacc = self.flow_accumulation()
         region = gscript.parse_command("g.region", flags="g")
         res = region["nsres"]
-        gscript.mapcalc(f"{depth}=({flowacc}*{res})", overwrite=True)
+        # derive depth from flow accumulation in the expression that uses it,
+        # only writing the depth of registered steps that request it
+        accumulated = f"({flowacc}*{res})"
+        if self.persist and "depth" in self.outputs:
+            gscript.mapcalc(f"{depth}={accumulated}", overwrite=True)
+            accumulated = depth
+        else:
+            depth = None
+
         # add depression parameter to r.watershed
         # derive from landcover class
 
         # compute dimensionless topographic factor
         gscript.mapcalc(
-            f"{ls_factor}=({depth}^{self.m})*(sin({slope})^{self.n})", overwrite=True
+            f"{ls_factor}=({accumulated}^{self.m})*(sin({slope})^{self.n})",
+            overwrite=True,
         )
 
         # compute sediment flow at sediment transport capacity
@@ -1068,7 +2198,7 @@ class Evolution:
             "*{ton_to_kg}"
             "/{ha_to_m2}"
             "/{yr_to_s}".format(
-                converted_sedflow=sediment_flux,
+                converted_sedflow=sedflux,
                 sedflow=sedflow,
                 ton_to_kg=1000.0,
                 ha_to_m2=10000.0,
@@ -1077,41 +2207,40 @@ class Evolution:
             overwrite=True,
         )
 
-        # compute sediment flow rate in x direction (m^2/s)
-        gscript.mapcalc(f"{qsx}={sediment_flux}*cos({aspect})", overwrite=True)
-
-        # compute sediment flow rate in y direction (m^2/s)
-        gscript.mapcalc(f"{qsy}={sediment_flux}*sin({aspect})", overwrite=True)
-
-        # compute change in sediment flow in x direction
-        # as partial derivative of sediment flow field
-        gscript.run_command(
-            "r.slope.aspect", elevation=qsx, dx=qsxdx, flags="e", overwrite=True
-        )
-
-        # compute change in sediment flow in y direction
-        # as partial derivative of sediment flow field
-        gscript.run_command(
-            "r.slope.aspect", elevation=qsy, dy=qsydy, flags="e", overwrite=True
-        )
-
         # compute net erosion-deposition (kg/m^2s)
         # as divergence of sediment flow
-        gscript.mapcalc(f"{erdep} = {qsxdx} + {qsydy}", overwrite=True)
+        erdep = self.sediment_divergence(sedflux, aspect, erdep)
 
         # filter outliers
-        gscript.mapcalc(
-            f"{erosion_deposition}"
-            f"=if({erdep}<{self.erdepmin},"
+        filtered = (
+            f"if({erdep}<{self.erdepmin},"
             f"{self.erdepmin},"
-            f"if({erdep}>{self.erdepmax},{self.erdepmax},{erdep}))",
-            overwrite=True,
+            f"if({erdep}>{self.erdepmax},{self.erdepmax},{erdep}))"
         )
+        if erosion_deposition:
+            stored = self.stored(filtered, scaled=True)
+            gscript.mapcalc(f"{erosion_deposition}={stored}", overwrite=True)
+
+            # set color table
+            if self.quantum:
+                writer.submit(
+                    gscript.run_command,
+                    "r.colors",
+                    map=erosion_deposition,
+                    color="differences",
+                )
+            else:
+                writer.submit(
+                    gscript.write_command,
+                    "r.colors",
+                    map=erosion_deposition,
+                    rules="-",
+                    stdin=erosion_colors,
+                )
 
-        # set color table
-        gscript.write_command(
-            "r.colors", map=erosion_deposition, rules="-", stdin=erosion_colors
-        )
+            # reuse the map unless it is stored at a lower precision
+            if stored == filtered:
+                filtered = erosion_deposition
 
         # evolve landscape
         """
@@ -1124,7 +2253,7 @@ class Evolution:
             f"{evolved_elevation}"
             f"={self.elevation}"
             f"+({self.rain_interval}*60"
-            f"*{erosion_deposition}"
+            f"*{filtered}"
             f"/{self.density})",
             overwrite=True,
         )
@@ -1140,34 +2269,32 @@ class Evolution:
             "g.remove",
             type="raster",
             name=[
-                "slope",
-                "aspect",
-                "flowacc",
-                "qsx",
-                "qsy",
-                "qsxdx",
-                "qsydy",
-                "erdep",
-                "sedflow",
-                "r_factor",
-                "ls_factor",
+                slope,
+                aspect,
+                flowacc,
+                erdep,
+                sedflow,
+                temporary.name("flux"),
+                temporary.name("r_factor"),
+                ls_factor,
             ],
             flags="f",
         )
 
         return (evolved_elevation, time, depth, erosion_deposition, difference)
 
+    @profiled("sediment")
     def rusle(self):
         """a detachment limited landscape evolution model
         using the RUSLE (Revised Universal Soil Loss Equation) model
         to evolve a digital elevation model"""
 
         # assign variables
-        ls_factor = "ls_factor"
-        slope = "slope"
-        flowacc = "flowacc"
-        sedflow = "sedflow"
-        sedflux = "flux"
+        ls_factor = temporary.name("ls_factor")
+        slope = temporary.name("slope")
+        flowacc = temporary.name("flowacc")
+        sedflow = temporary.name("sedflow")
+        sedflux = temporary.name("flux")
 
         # parse, advance, and stamp time
         (
@@ -1192,22 +2319,23 @@ class Evolution:
         )
 
         # compute flow accumulation
-        gscript.run_command(
-            "r.watershed",
-            elevation=self.elevation,
-            accumulation=flowacc,
-            flags="a",
-            overwrite=True,
-        )
+        flowacc = self.flow_accumulation()
         region = gscript.parse_command("g.region", flags="g")
         res = region["nsres"]
-        gscript.mapcalc(f"{depth}=({flowacc}*{res})", overwrite=True)
+        # derive depth from flow accumulation in the expression that uses it,
+        # only writing the depth of registered steps that request it
+        accumulated = f"({flowacc}*{res})"
+        if self.persist and "depth" in self.outputs:
+            gscript.mapcalc(f"{depth}={accumulated}", overwrite=True)
+            accumulated = depth
+        else:
+            depth = None
 
         # compute dimensionless topographic factor
         gscript.mapcalc(
             f"{ls_factor}"
             f"=({self.m}+1.0)"
-            f"*(({depth}/22.1)^{self.m})"
+            f"*(({accumulated}/22.1)^{self.m})"
             f"*((sin({slope})/5.14)^{self.n})",
             overwrite=True,
         )
@@ -1248,12 +2376,21 @@ class Evolution:
         )
 
         # filter outliers
-        gscript.mapcalc(
-            f"{sediment_flux}"
-            f"=if({sedflux}>{self.erdepmax},{self.erdepmax},{sedflux})",
-            overwrite=True,
-        )
-        gscript.run_command("r.colors", map=sediment_flux, color="viridis", flags="g")
+        filtered = f"if({sedflux}>{self.erdepmax},{self.erdepmax},{sedflux})"
+        if sediment_flux:
+            stored = self.stored(filtered)
+            gscript.mapcalc(f"{sediment_flux}={stored}", overwrite=True)
+            writer.submit(
+                gscript.run_command,
+                "r.colors",
+                map=sediment_flux,
+                color="viridis",
+                flags="g",
+            )
+
+            # reuse the map unless it is stored at a lower precision
+            if stored == filtered:
+                filtered = sediment_flux
 
         # evolve landscape
         """
@@ -1266,7 +2403,7 @@ class Evolution:
             f"{evolved_elevation}"
             f"={self.elevation}"
             f"-({self.rain_interval}*60"
-            f"*{sediment_flux}"
+            f"*{filtered}"
             f"/{self.mass})",
             overwrite=True,
         )
@@ -1282,14 +2419,13 @@ class Evolution:
             "g.remove",
             type="raster",
             name=[
-                "slope",
-                "flowacc",
-                "sedflow",
-                "flux",
-                "settled_elevation",
-                "divergence",
-                "r_factor",
-                "ls_factor",
+                slope,
+                flowacc,
+                sedflow,
+                sedflux,
+                temporary.name("settled_elevation"),
+                temporary.name("r_factor"),
+                ls_factor,
             ],
             flags="f",
         )
@@ -1297,165 +2433,1278 @@ class Evolution:
         return (evolved_elevation, time, depth, sediment_flux, difference)
 
 
-class DynamicEvolution:
-    def __init__(
-        self,
-        elevation,
-        mode,
-        precipitation,
-        start,
-        rain_intensity,
-        rain_duration,
-        rain_interval,
-        temporaltype,
-        elevation_timeseries,
-        elevation_title,
-        elevation_description,
-        depth_timeseries,
-        depth_title,
-        depth_description,
-        erdep_timeseries,
-        erdep_title,
-        erdep_description,
-        flux_timeseries,
-        flux_title,
-        flux_description,
-        difference_timeseries,
-        difference_title,
-        difference_description,
-        walkers,
-        runoff,
-        mannings,
-        detachment,
-        transport,
-        shearstress,
-        density,
-        mass,
-        grav_diffusion,
-        erdepmin,
-        erdepmax,
-        k_factor,
-        c_factor,
-        m,
-        n,
-        threads,
-        fill_depressions,
-    ):
-        self.elevation = elevation
-        self.mode = mode
-        self.precipitation = precipitation
-        self.start = start
-        self.rain_intensity = rain_intensity
-        self.rain_duration = rain_duration
-        self.rain_interval = rain_interval
-        self.temporaltype = temporaltype
-        self.elevation_timeseries = elevation_timeseries
-        self.elevation_title = elevation_title
-        self.elevation_description = elevation_description
-        self.depth_timeseries = depth_timeseries
-        self.depth_title = depth_title
-        self.depth_description = depth_description
-        self.erdep_timeseries = erdep_timeseries
-        self.erdep_title = erdep_title
-        self.erdep_description = erdep_description
-        self.flux_timeseries = flux_timeseries
-        self.flux_title = flux_title
-        self.flux_description = flux_description
-        self.difference_timeseries = difference_timeseries
-        self.difference_title = difference_title
-        self.difference_description = difference_description
-        self.walkers = walkers
-        self.runoff = runoff
-        self.mannings = mannings
-        self.detachment = detachment
-        self.transport = transport
-        self.shearstress = shearstress
-        self.density = density
-        self.mass = mass
-        self.grav_diffusion = grav_diffusion
-        self.erdepmin = erdepmin
-        self.erdepmax = erdepmax
-        self.k_factor = k_factor
-        self.c_factor = c_factor
-        self.m = m
-        self.n = n
-        self.threads = threads
-        self.fill_depressions = fill_depressions
+class ArrayEvolution(Evolution):
+    """landscape evolution model that keeps the evolving elevation
+    and the input parameters in memory as numpy arrays, reading rasters
+    once and only writing the maps that are registered in the time series"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # resolution of the computational region
+        region = gscript.region()
+        self.ewres = region["ewres"]
+        self.nsres = region["nsres"]
+
+        # read the elevation and parameters once
+        self.elevation_array = read_array(self.elevation)
+        self.registered_elevation_array = self.elevation_array
+        self.depth_array = None
+        self.runoff_array = read_array(self.runoff)
+        self.density_array = read_array(self.density)
+        self.mass_array = read_array(self.mass)
+        self.k_factor_array = read_array(self.k_factor)
+        self.c_factor_array = read_array(self.c_factor)
+        if self.hydrology != "modules":
+            self.mannings_array = read_array(self.mannings)
+        if self.hydrology == "path_sampling":
+            self.detachment_array = read_array(self.detachment)
+            self.transport_array = read_array(self.transport)
+            self.shearstress_array = read_array(self.shearstress)
+
+        # rate of elevation change reused by adaptive time steps
+        self.rainfall = None
+        self.rate = None
+        self.rate_output = None
+        self.rate_change = 0.0
+        self.rate_rainfall = None
+        self.rate_limited = False
+
+        # whether the elevation map holds the evolving elevation
+        self.elevation_written = True
+
+    def write_output(self, array, raster, scaled=False, **colors):
+        """write an output map in single or double precision
+        or scaled by the quantum as integers"""
+
+        if scaled and self.quantum:
+            writer.submit(
+                write_array, array, raster, color="differences", quantum=self.quantum
+            )
+        else:
+            writer.submit(
+                write_array, array, raster, precision=self.precision, **colors
+            )
 
-    def rainfall_event(self):
-        """a dynamic, process-based landscape evolution model
-        of a single rainfall event that generates a timeseries
-        of digital elevation models"""
+        return raster
 
-        # assign local variables
-        datatype = "strds"
-        increment = str(self.rain_interval) + " minutes"
-        raster = "raster"
-        iterations = int(self.rain_duration) / int(self.rain_interval)
-        rain_excess = "rain_excess"
-        net_difference = "net_difference"
+    def elevation_map(self):
+        """elevation map read by GRASS modules,
+        waiting for the maps queued for the background writer
+        and writing the elevation of a step whose output was skipped"""
 
-        # create raster space time datasets
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.elevation_timeseries,
-            title=self.elevation_title,
-            description=self.elevation_description,
-            overwrite=True,
+        writer.wait()
+        if not self.elevation_written:
+            write_array(self.elevation_array, self.elevation, color="elevation")
+            self.elevation_written = True
+
+        return self.elevation
+
+    def tiled(self, function, arrays, halo):
+        """apply a local function to the whole region
+        or to its tiles in parallel"""
+
+        if not self.tile_size:
+            return function(*arrays)
+
+        return tiled(
+            function, arrays, self.tile_size, halo, process_pool(int(self.threads))
         )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.depth_timeseries,
-            title=self.depth_title,
-            description=self.depth_description,
+
+    @profiled("slope")
+    def compute_slope(self):
+        """compute slope and partial derivatives"""
+
+        dx, dy = partial_derivatives(self.elevation_array, self.ewres, self.nsres)
+        slope = slope_degrees(dx, dy)
+
+        return slope, dx, dy
+
+    @profiled("hydrology")
+    def simwe(self, dx, dy, depth):
+        """hydrologic simulation using a monte carlo path sampling method
+        to solve the shallow water flow equations"""
+
+        # reuse the water depth of the last hydrologic simulation
+        if self.warm_start(depth):
+            return depth
+
+        # assign variables
+        rain = temporary.name("rain")
+
+        # hydrology parameters
+        write_array(self.rain_intensity * self.runoff_array, rain)
+
+        # hydrologic simulation
+        self.walker_sample(
+            "r.sim.water",
+            "depth",
+            elevation=self.elevation_map(),
+            dx=dx,
+            dy=dy,
+            rain=rain,
+            man=self.mannings,
+            depth=depth,
+            niterations=self.rain_interval,
+            nprocs=self.threads,
             overwrite=True,
         )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.erdep_timeseries,
-            title=self.erdep_title,
-            description=self.erdep_description,
-            overwrite=True,
+        self.depth_array = read_array(depth)
+
+        # remove temporary maps
+        gscript.run_command("g.remove", type="raster", name=[rain], flags="f")
+
+        # keep the state of the hydrologic simulation for warm starts
+        if self.hydrology_tolerance is not None:
+            self.last_hydrology = (
+                self.hydrology_elevation(),
+                self.rainfall,
+                depth,
+            )
+
+        return depth
+
+    def average_samples(self, halves, output):
+        """average two half-samples and estimate the relative error
+        of their mean from their difference"""
+
+        a, b = (read_array(half) for half in halves)
+        write_array((a + b) / 2.0, output)
+        gscript.run_command("g.remove", type="raster", name=halves, flags="f")
+
+        return half_sample_error(a, b)
+
+    @profiled("hydrology")
+    def diffusive_wave(self, dx, dy, depth):
+        """deterministic hydrologic simulation of the water depth
+        of the rainfall excess routed as overland flow
+        with an explicit diffusive wave model"""
+
+        # reuse the water depth of the last hydrologic simulation
+        if self.warm_start(depth):
+            return depth
+
+        # rainfall excess (m/s)
+        rain = self.rain_intensity * self.runoff_array / 1000.0 / 3600.0
+
+        # water depth (m) read by the erosion-deposition simulation
+        self.depth_array = diffusive_wave(
+            self.elevation_array,
+            np.hypot(dx, dy),
+            rain,
+            self.mannings_array,
+            self.ewres,
+            self.nsres,
+            self.rain_interval * 60.0,
         )
+        write_array(self.depth_array, depth)
+
+        # keep the state of the hydrologic simulation for warm starts
+        if self.hydrology_tolerance is not None:
+            self.last_hydrology = (
+                self.hydrology_elevation(),
+                self.rainfall,
+                depth,
+            )
+
+        return depth
+
+    @profiled("hydrology")
+    def sample_water(self, dx, dy, depth):
+        """hydrologic simulation in process by sampling the paths
+        of walkers of water released by the rainfall excess
+        that move with the overland flow and diffuse"""
+
+        # reuse the water depth of the last hydrologic simulation
+        if self.warm_start(depth):
+            return depth
+
+        # rainfall excess (m/s) times the area of the cells
+        area = self.ewres * self.nsres
+        rain = self.rain_intensity * self.runoff_array / 1000.0 / 3600.0
+
+        # velocity and diffusivity of overland flow at the steady depth
+        # of the rainfall excess draining to each cell
+        if self.flow_engine is None:
+            self.flow_engine = FlowAccumulation(self.ewres, self.nsres)
+        gradient = np.hypot(dx, dy)
+        excess = kinematic_depth(
+            rain,
+            self.flow_engine.update(self.elevation_array),
+            gradient,
+            self.mannings_array,
+            self.ewres,
+            self.nsres,
+            self.rain_interval * 60.0,
+        )
+        east, south, speed = overland_velocity(dx, dy, self.mannings_array, excess)
+        diffusion = hydraulic_diffusivity(excess, speed, gradient)
+
+        # water depth (m) from the volume of water (m^3) in each cell
+        self.depth_array = self.sample_paths(rain * area, east, south, diffusion) / area
+        if "depth" in self.outputs and self.persist:
+            self.write_output(self.depth_array, depth)
+
+        # keep the state of the hydrologic simulation for warm starts
+        if self.hydrology_tolerance is not None:
+            self.last_hydrology = (
+                self.hydrology_elevation(),
+                self.rainfall,
+                depth,
+            )
+
+        return depth
+
+    def sample_sediment(self, slope, dx, dy):
+        """erosion-deposition (kg/m^2s) simulated in process
+        by sampling the paths of walkers of sediment detached by the flow
+        that move with the overland flow and deposit
+        at a rate that approaches the transport capacity"""
+
+        area = self.ewres * self.nsres
+
+        # velocity and diffusivity of overland flow at the simulated water depth
+        east, south, speed = overland_velocity(
+            dx, dy, self.mannings_array, self.depth_array
+        )
+        diffusion = hydraulic_diffusivity(self.depth_array, speed, np.hypot(dx, dy))
+
+        # shear stress (Pa) of the water depth on the slope
+        shear = 1000.0 * 9.81 * self.depth_array * np.sin(np.radians(slope))
+
+        # transport capacity (kg/ms) and detachment capacity (kg/m^2s)
+        capacity = self.transport_array * shear**1.5
+        detachment = self.detachment_array * np.clip(
+            shear - self.shearstress_array, 0.0, None
+        )
+
+        # first order rate of deposition (1/m) over the flow path,
+        # depositing within a cell without transport capacity
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(
+                capacity > 0,
+                detachment / capacity,
+                1.0 / min(self.ewres, self.nsres),
+            )
+
+        # sediment flux (kg/ms) from the sediment (kg) in each cell
+        sediment = self.sample_paths(
+            detachment * area, east, south, diffusion, decay=rate * speed
+        )
+        flux = sediment / area * speed
+
+        # net erosion-deposition as deposition minus detachment
+        return rate * flux - detachment
+
+    def sample_paths(self, source, east, south, diffusion, decay=None):
+        """sample the paths of the walkers of the step,
+        or of two half-samples whose difference estimates
+        the relative error of their mean when tuning the walkers"""
+
+        samples = 2 if self.walker_error else 1
+        results = []
+        for sample in range(samples):
+            self.seed = self.seed + 1
+            results.append(
+                parallel_path_sampling(
+                    source,
+                    east,
+                    south,
+                    self.ewres,
+                    self.nsres,
+                    self.rain_interval * 60.0,
+                    max(1, int(self.walkers) // samples),
+                    self.seed,
+                    int(self.threads),
+                    diffusion,
+                    decay=decay,
+                )
+            )
+        if samples == 1:
+            return results[0]
+        self.errors.append(half_sample_error(*results))
+
+        return (results[0] + results[1]) / 2.0
+
+    def hydrology_elevation(self):
+        """keep the elevation of a hydrologic simulation"""
+
+        return self.elevation_array
+
+    def elevation_change(self, elevation):
+        """maximum change in elevation (m) since an elevation"""
+
+        return np.nanmax(np.abs(self.elevation_array - elevation))
+
+    @profiled("erosivity")
+    def event_based_r_factor(self):
+        """compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1)"""
+
+        # compute a scalar R factor from the rainfall rate,
+        # leaving out the water depth of the previous step
+        rainfall = self.rain_intensity
+        if np.ndim(rainfall) != 0:
+            rainfall = self.rainfall
+        if rainfall is not None and np.ndim(rainfall) == 0:
+            return uniform_r_factor(float(rainfall), self.rain_interval)
+
+        with np.errstate(invalid="ignore"):
+            # derive rainfall energy (MJ ha^-1 mm^-1)
+            rain_energy = 0.29 * (1.0 - (0.72 * np.exp(-0.05 * self.rain_intensity)))
+
+            # derive rainfall volume (mm)
+            rain_volume = self.rain_intensity * (self.rain_interval / 60.0)
+
+            # derive event erosivity index (MJ mm ha^-1 hr^-1)
+            erosivity = (rain_energy * rain_volume) * self.rain_intensity
+
+            # derive R factor (MJ mm ha^-1 hr^-1 yr^1)
+            r_factor = erosivity / (self.rain_interval / 525600.0)
+
+        return r_factor
+
+    @profiled("accumulation")
+    def flow_accumulation(self):
+        """compute flow accumulation from the current elevation"""
+
+        # assign variables
+        flowacc = temporary.name("flowacc")
+
+        # recompute flow accumulation in tiles, which keep no state between steps
+        if self.accumulation == "incremental" and self.tile_size:
+            return tiled_accumulation(
+                self.elevation_array,
+                self.ewres,
+                self.nsres,
+                self.tile_size,
+                process_pool(int(self.threads)),
+            )
+
+        # update flow accumulation downstream of changed flow directions
+        if self.accumulation == "incremental":
+            if self.flow_engine is None:
+                self.flow_engine = FlowAccumulation(self.ewres, self.nsres)
+            return self.flow_engine.update(self.elevation_array)
+
+        # compute flow accumulation
         gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.flux_timeseries,
-            title=self.flux_title,
-            description=self.flux_description,
+            "r.watershed",
+            elevation=self.elevation_map(),
+            accumulation=flowacc,
+            flags="a",
             overwrite=True,
         )
+        accumulation = read_array(flowacc)
+
+        # remove temporary maps
+        gscript.run_command("g.remove", type="raster", name=[flowacc], flags="f")
+
+        return accumulation
+
+    @profiled("diffusion")
+    def gravitational_diffusion(self, evolved_elevation):
+        """settling of sediment due to gravitational diffusion"""
+
+        # skip settling without gravitational diffusion
+        if float(self.grav_diffusion) == 0:
+            return evolved_elevation
+
+        # compute settling caused by gravitational diffusion
+        return evolved_elevation + (
+            self.rain_interval
+            * 60
+            / self.density_array
+            * float(self.grav_diffusion)
+            * self.tiled(
+                functools.partial(
+                    laplacian,
+                    ewres=self.ewres,
+                    nsres=self.nsres,
+                    stencil=self.laplacian,
+                ),
+                [evolved_elevation],
+                halo=1,
+            )
+        )
+
+    @profiled("filling")
+    def fill_sinks(self, evolved_elevation):
+        """fill sinks in digital elevation model"""
+
+        # fill sinks in memory
+        if self.fill_method == "priority_flood" and self.tile_size:
+            if not self.fill_epsilon:
+                return tiled_priority_flood(
+                    evolved_elevation,
+                    self.tile_size,
+                    process_pool(int(self.threads)),
+                )
+        if self.fill_method == "priority_flood":
+            return priority_flood(evolved_elevation, self.fill_epsilon)
+
+        # assign variables
+        unfilled_elevation = temporary.name("unfilled_elevation")
+        depressionless_elevation = temporary.name("depressionless_elevation")
+        direction = temporary.name("flow_direction")
+
+        # fill sinks
+        write_array(evolved_elevation, unfilled_elevation)
         gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.difference_timeseries,
-            title=self.difference_title,
-            description=self.difference_description,
+            "r.fill.dir",
+            input=unfilled_elevation,
+            output=depressionless_elevation,
+            direction=direction,
             overwrite=True,
         )
+        evolved_elevation = read_array(depressionless_elevation)
 
-        # register the initial digital elevation model
+        # remove temporary maps
         gscript.run_command(
-            "t.register",
-            type=raster,
-            input=self.elevation_timeseries,
-            maps=self.elevation,
-            start=self.start,
-            increment=increment,
-            flags="i",
-            overwrite=True,
+            "g.remove",
+            type="raster",
+            name=[unfilled_elevation, depressionless_elevation, direction],
+            flags="f",
+        )
+
+        return evolved_elevation
+
+    @profiled("difference")
+    def compute_difference(self, evolved_elevation, difference):
+        """compute the change in elevation since the last registered step"""
+
+        return evolved_elevation - self.registered_elevation_array
+
+    @profiled("rainfall")
+    def excess_rainfall(self, rain_intensity, depth):
+        """derive excess water (mm/hr) from rainfall rate (mm/hr)
+        plus the depth (m) per rainfall interval (min)"""
+
+        self.rainfall = rain_intensity
+
+        return rain_intensity + self.depth_array / 1000.0 / self.rain_interval * 60.0
+
+    def dry_period(self, duration):
+        """evolve the landscape by gravitational diffusion alone
+        over a dry period (min)"""
+
+        # advance time over the dry period
+        rain_interval = self.rain_interval
+        self.rain_interval = duration
+        (
+            evolved_elevation,
+            time,
+            depth,
+            sediment_flux,
+            erosion_deposition,
+            difference,
+        ) = self.parse_time()
+
+        # gravitational diffusion in stable substeps
+        substeps = 1
+        if float(self.grav_diffusion) != 0:
+            substeps = diffusion_substeps(
+                duration,
+                float(self.grav_diffusion),
+                np.nanmin(self.density_array),
+                self.ewres,
+                self.nsres,
+            )
+        self.rain_interval = duration / substeps
+        evolved = self.elevation_array
+        for substep in range(substeps):
+            evolved = self.gravitational_diffusion(evolved)
+        self.rain_interval = rain_interval
+        self.rate = None
+        self.last_hydrology = None
+
+        # write the evolved elevation and compute elevation change
+        self.evolve(evolved, evolved_elevation, difference)
+
+        return evolved_elevation, time, difference
+
+    def save_depth(self, depth, saved_depth):
+        """save the depth carried over to the next step"""
+
+        return write_array(self.depth_array, saved_depth)
+
+    def load_depth(self, depth):
+        """load the depth carried over to the next step"""
+
+        self.depth_array = read_array(depth)
+
+        return depth
+
+    def adaptive_evolution(self, rate):
+        """evolve the landscape over the rainfall interval in adaptive steps
+        that limit the maximum change in elevation
+        and keep gravitational diffusion stable,
+        reusing the rate of change while the landscape is calm
+
+        returns the evolved elevation and the output of the rate,
+        which registered steps compute for the elevation at their start"""
+
+        # assign variables
+        rain_interval = self.rain_interval
+        elevation = self.elevation_array
+        max_change = float(self.max_change)
+        if np.ndim(self.rain_intensity) == 0:
+            rainfall = self.rain_intensity
+        else:
+            rainfall = self.rainfall
+
+        # longest stable time step of gravitational diffusion (s)
+        duration = rain_interval * 60.0
+        diffusion_step = duration
+        if float(self.grav_diffusion) != 0:
+            diffusion_step = duration / diffusion_substeps(
+                rain_interval,
+                float(self.grav_diffusion),
+                np.nanmin(self.density_array),
+                self.ewres,
+                self.nsres,
+            )
+
+        # recompute the rate of registered steps for the elevation at their start
+        # so that their outputs describe the step rather than an earlier one
+        if self.persist and self.rate_change > 0:
+            self.rate = None
+
+        remaining = duration
+        output = None
+        while remaining > 0:
+            # compute the rate of change (m/s) unless it can be reused
+            if (
+                self.rate is None
+                or self.rate_change >= max_change * (1.0 - 1e-9)
+                or rainfall != self.rate_rainfall
+            ):
+                self.rate, self.rate_output = rate()
+                self.rate_change = 0.0
+                self.rate_rainfall = rainfall
+
+            # keep the output and water depth of the start of the step
+            if output is None:
+                output = self.rate_output
+                depth = self.depth_array
+            max_rate = np.nanmax(np.abs(self.rate))
+
+            # time step (s) limited by the change left for the rate
+            # and by the stability of gravitational diffusion
+            # with at most max_adaptive_steps limited by the change per interval
+            step = min(remaining, diffusion_step)
+            if max_rate > 0:
+                limit = (max_change - self.rate_change) / max_rate
+                if max_change / max_rate < duration / max_adaptive_steps:
+                    limit = duration / max_adaptive_steps
+                    self.limit_warning(max_rate * limit)
+                step = min(step, limit)
+
+            # evolve landscape
+            self.rain_interval = step / 60.0
+            self.elevation_array = self.gravitational_diffusion(
+                self.elevation_array + step * self.rate
+            )
+            self.rain_interval = rain_interval
+            self.rate_change += max_rate * step
+            remaining = remaining - step if step < remaining else 0.0
+
+        evolved = self.elevation_array
+        self.elevation_array = elevation
+        self.depth_array = depth
+
+        return evolved, output
+
+    def limit_warning(self, change):
+        """warn once that the adaptive steps are limited per interval
+        and change the elevation by more than max_change"""
+
+        if self.rate_limited:
+            return
+        self.rate_limited = True
+        gscript.warning(
+            f"The adaptive time steps are limited to {max_adaptive_steps} "
+            f"per rainfall interval and change the elevation by up to "
+            f"{change:.4g} m per step, more than max_change"
+        )
+
+    def usped_rate(self):
+        """rate of elevation change (m/s) and net erosion-deposition (kg/m^2s)
+        of USPED for the current elevation"""
+
+        # compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1 yr^-1)
+        r_factor = self.event_based_r_factor()
+
+        # compute flow accumulation
+        self.depth_array = self.flow_accumulation() * self.nsres
+
+        # compute sediment flow field and its divergence in a single pass
+        # with a halo of two cells for the gradient and the divergence
+        erdep = self.tiled(
+            functools.partial(
+                usped_kernel,
+                m=float(self.m),
+                n=float(self.n),
+                erdepmin=float(self.erdepmin),
+                erdepmax=float(self.erdepmax),
+                ewres=self.ewres,
+                nsres=self.nsres,
+                edges=self.edges,
+            ),
+            [
+                self.elevation_array,
+                self.depth_array,
+                r_factor,
+                self.k_factor_array,
+                self.c_factor_array,
+            ],
+            halo=2,
+        )
+
+        return erdep / self.density_array, erdep
+
+    def rusle_rate(self):
+        """rate of elevation change (m/s) and sediment flux (kg/ms)
+        of RUSLE for the current elevation"""
+
+        # compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1 yr^-1)
+        r_factor = self.event_based_r_factor()
+
+        # compute flow accumulation
+        self.depth_array = self.flow_accumulation() * self.nsres
+
+        # compute the change in elevation over a second in a single pass
+        flux, evolved = self.tiled(
+            functools.partial(
+                rusle_kernel,
+                m=float(self.m),
+                n=float(self.n),
+                erdepmax=float(self.erdepmax),
+                duration=1.0,
+                ewres=self.ewres,
+                nsres=self.nsres,
+            ),
+            [
+                self.elevation_array,
+                self.depth_array,
+                r_factor,
+                self.k_factor_array,
+                self.c_factor_array,
+                self.mass_array,
+            ],
+            halo=1,
+        )
+
+        return evolved - self.elevation_array, flux
+
+    @profiled("output")
+    def evolve(self, evolved, evolved_elevation, difference):
+        """write the evolved elevation and its change
+        and carry the evolved state over to the next step"""
+
+        # skip the elevation of the steps between outputs
+        if self.persist:
+            self.write_output(evolved, evolved_elevation, color="elevation")
+        self.elevation_written = self.persist
+        if difference:
+            self.write_output(
+                self.compute_difference(evolved, difference),
+                difference,
+                scaled=True,
+                color="differences",
+            )
+        if self.persist:
+            self.registered_elevation_array = evolved
+        self.elevation_array = evolved
+
+    @profiled("sediment")
+    def erosion_deposition(self):
+        """a process-based landscape evolution model using simulated
+        erosion and deposition to evolve a digital elevation model"""
+
+        # assign variables
+        erdep = temporary.name("erdep")  # kg/m^2s
+        dx = temporary.name("dx")
+        dy = temporary.name("dy")
+
+        # parse, advance, and stamp time
+        (
+            evolved_elevation,
+            time,
+            depth,
+            sediment_flux,
+            erosion_deposition,
+            difference,
+        ) = self.parse_time()
+
+        # compute slope and partial derivatives
+        slope, dx_array, dy_array = self.compute_slope()
+
+        if self.hydrology == "path_sampling":
+            # hydrologic and erosion-deposition simulation in process
+            depth = self.sample_water(dx_array, dy_array, depth)
+            erdep_array = self.sample_sediment(slope, dx_array, dy_array)
+
+        else:
+            elevation = self.elevation_map()
+            write_array(dx_array, dx)
+            write_array(dy_array, dy)
+
+            # hydrologic simulation
+            if self.hydrology == "diffusive_wave":
+                depth = self.diffusive_wave(dx_array, dy_array, depth)
+            else:
+                depth = self.simwe(dx, dy, depth)
+
+            # erosion-deposition simulation
+            self.walker_sample(
+                "r.sim.sediment",
+                "erosion_deposition",
+                elevation=elevation,
+                water_depth=depth,
+                dx=dx,
+                dy=dy,
+                detachment_coeff=self.detachment,
+                transport_coeff=self.transport,
+                shear_stress=self.shearstress,
+                man=self.mannings,
+                erosion_deposition=erdep,
+                niterations=self.rain_interval,
+                nprocs=self.threads,
+                overwrite=True,
+            )
+            erdep_array = read_array(erdep)
+
+        # tune the walkers of the next step
+        if self.walker_error:
+            self.tune_walkers()
+
+        # filter outliers
+        erdep_array = np.clip(erdep_array, float(self.erdepmin), float(self.erdepmax))
+        if erosion_deposition and self.hydrology == "path_sampling":
+            self.write_output(
+                erdep_array, erosion_deposition, scaled=True, rules=erosion_colors
+            )
+        elif erosion_deposition:
+            self.write_output(erdep_array, erosion_deposition, scaled=True)
+            if not self.quantum:
+                writer.submit(
+                    gscript.run_command,
+                    "r.colors",
+                    map=erosion_deposition,
+                    raster=erdep,
+                )
+
+        # evolve landscape
+        evolved = self.elevation_array + (
+            self.rain_interval * 60 * erdep_array / self.density_array
+        )
+
+        # fill sinks
+        if self.fill_depressions:
+            evolved = self.fill_sinks(evolved)
+
+        # gravitational diffusion
+        evolved = self.gravitational_diffusion(evolved)
+
+        # write the evolved elevation and compute elevation change
+        self.evolve(evolved, evolved_elevation, difference)
+
+        # remove temporary maps after their color table is copied
+        if self.hydrology != "path_sampling":
+            writer.submit(
+                gscript.run_command,
+                "g.remove",
+                type="raster",
+                name=[erdep, dx, dy],
+                flags="f",
+            )
+
+        return (evolved_elevation, time, depth, erosion_deposition, difference)
+
+    @profiled("sediment")
+    def usped(self):
+        """a transport limited landscape evolution model
+        using the USPED (Unit Stream Power Based Model) model to evolve
+        a digital elevation model"""
+
+        # parse, advance, and stamp time
+        (
+            evolved_elevation,
+            time,
+            depth,
+            sediment_flux,
+            erosion_deposition,
+            difference,
+        ) = self.parse_time()
+
+        # evolve landscape in adaptive steps
+        if self.max_change:
+            evolved, erdep = self.adaptive_evolution(self.usped_rate)
+
+        else:
+            # compute net erosion-deposition
+            rate, erdep = self.usped_rate()
+
+            # evolve landscape
+            evolved = self.elevation_array + self.rain_interval * 60 * rate
+
+            # gravitational diffusion
+            evolved = self.gravitational_diffusion(evolved)
+
+        if self.persist and "depth" in self.outputs:
+            self.write_output(self.depth_array, depth)
+        if erosion_deposition:
+            self.write_output(
+                erdep, erosion_deposition, scaled=True, rules=erosion_colors
+            )
+
+        # write the evolved elevation and compute elevation change
+        self.evolve(evolved, evolved_elevation, difference)
+
+        return (evolved_elevation, time, depth, erosion_deposition, difference)
+
+    @profiled("sediment")
+    def rusle(self):
+        """a detachment limited landscape evolution model
+        using the RUSLE (Revised Universal Soil Loss Equation) model
+        to evolve a digital elevation model"""
+
+        # parse, advance, and stamp time
+        (
+            evolved_elevation,
+            time,
+            depth,
+            sediment_flux,
+            erosion_deposition,
+            difference,
+        ) = self.parse_time()
+
+        # evolve landscape in adaptive steps
+        if self.max_change:
+            evolved, flux = self.adaptive_evolution(self.rusle_rate)
+
+        else:
+            # compute event-based erosivity (R) factor (MJ mm ha^-1 hr^-1 yr^-1)
+            r_factor = self.event_based_r_factor()
+
+            # compute flow accumulation
+            self.depth_array = self.flow_accumulation() * self.nsres
+
+            # compute slope, topographic factor, sediment flow,
+            # filter outliers, and evolve landscape in a single pass
+            flux, evolved = self.tiled(
+                functools.partial(
+                    rusle_kernel,
+                    m=float(self.m),
+                    n=float(self.n),
+                    erdepmax=float(self.erdepmax),
+                    duration=self.rain_interval * 60,
+                    ewres=self.ewres,
+                    nsres=self.nsres,
+                ),
+                [
+                    self.elevation_array,
+                    self.depth_array,
+                    r_factor,
+                    self.k_factor_array,
+                    self.c_factor_array,
+                    self.mass_array,
+                ],
+                halo=1,
+            )
+
+            # gravitational diffusion
+            evolved = self.gravitational_diffusion(evolved)
+
+        if self.persist and "depth" in self.outputs:
+            self.write_output(self.depth_array, depth)
+        if sediment_flux:
+            self.write_output(flux, sediment_flux, color="viridis", flags="g")
+
+        # write the evolved elevation and compute elevation change
+        self.evolve(evolved, evolved_elevation, difference)
+
+        return (evolved_elevation, time, depth, sediment_flux, difference)
+
+
+class DynamicEvolution:
+    def __init__(
+        self,
+        elevation,
+        mode,
+        precipitation,
+        start,
+        rain_intensity,
+        rain_duration,
+        rain_interval,
+        temporaltype,
+        elevation_timeseries,
+        elevation_title,
+        elevation_description,
+        depth_timeseries,
+        depth_title,
+        depth_description,
+        erdep_timeseries,
+        erdep_title,
+        erdep_description,
+        flux_timeseries,
+        flux_title,
+        flux_description,
+        difference_timeseries,
+        difference_title,
+        difference_description,
+        walkers,
+        runoff,
+        mannings,
+        detachment,
+        transport,
+        shearstress,
+        density,
+        mass,
+        grav_diffusion,
+        erdepmin,
+        erdepmax,
+        k_factor,
+        c_factor,
+        m,
+        n,
+        threads,
+        fill_depressions,
+        backend,
+        edges,
+        laplacian,
+        fill_method,
+        fill_epsilon,
+        accumulation,
+        register_batch,
+        checkpoint,
+        checkpoint_interval,
+        resume,
+        rain_threshold,
+        max_change,
+        tile_size,
+        run_id,
+        output_stride,
+        output_times,
+        precision,
+        quantum,
+        hydrology_tolerance,
+        walker_error,
+        hydrology,
+    ):
+        self.elevation = elevation
+        self.mode = mode
+        self.precipitation = precipitation
+        self.start = start
+        self.rain_intensity = rain_intensity
+        self.rain_duration = rain_duration
+        self.rain_interval = rain_interval
+        self.temporaltype = temporaltype
+        self.elevation_timeseries = elevation_timeseries
+        self.elevation_title = elevation_title
+        self.elevation_description = elevation_description
+        self.depth_timeseries = depth_timeseries
+        self.depth_title = depth_title
+        self.depth_description = depth_description
+        self.erdep_timeseries = erdep_timeseries
+        self.erdep_title = erdep_title
+        self.erdep_description = erdep_description
+        self.flux_timeseries = flux_timeseries
+        self.flux_title = flux_title
+        self.flux_description = flux_description
+        self.difference_timeseries = difference_timeseries
+        self.difference_title = difference_title
+        self.difference_description = difference_description
+        self.walkers = walkers
+        self.runoff = runoff
+        self.mannings = mannings
+        self.detachment = detachment
+        self.transport = transport
+        self.shearstress = shearstress
+        self.density = density
+        self.mass = mass
+        self.grav_diffusion = grav_diffusion
+        self.erdepmin = erdepmin
+        self.erdepmax = erdepmax
+        self.k_factor = k_factor
+        self.c_factor = c_factor
+        self.m = m
+        self.n = n
+        self.threads = threads
+        self.fill_depressions = fill_depressions
+        self.backend = backend
+        self.edges = edges
+        self.laplacian = laplacian
+        self.fill_method = fill_method
+        self.fill_epsilon = fill_epsilon
+        self.accumulation = accumulation
+        self.register_batch = register_batch
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+
+        # water depth saved for the checkpoints of a series
+        self.checkpoint_depth = None
+        self.rain_threshold = rain_threshold
+        self.max_change = max_change
+        self.tile_size = tile_size
+        self.run_id = run_id
+        self.output_stride = output_stride
+        self.output_times = output_times
+        self.precision = precision
+        self.quantum = quantum
+        self.hydrology_tolerance = hydrology_tolerance
+        self.walker_error = walker_error
+        self.hydrology = hydrology
+
+        # start of the steps since the last registered maps
+        self.since = None
+
+        # outputs registered in the requested space time datasets
+        self.outputs = [
+            output
+            for output, timeseries in [
+                ("depth", depth_timeseries),
+                ("erosion_deposition", erdep_timeseries),
+                ("sediment_flux", flux_timeseries),
+                ("difference", difference_timeseries),
+            ]
+            if timeseries
+        ]
+
+    def prefixed(self, name):
+        """name of a map prefixed with the identifier of the run"""
+
+        return f"{self.run_id}_{name}" if self.run_id else name
+
+    def create_timeseries(self):
+        """create the requested raster space time datasets"""
+
+        for timeseries, title, description in [
+            (
+                self.elevation_timeseries,
+                self.elevation_title,
+                self.elevation_description,
+            ),
+            (self.depth_timeseries, self.depth_title, self.depth_description),
+            (self.erdep_timeseries, self.erdep_title, self.erdep_description),
+            (self.flux_timeseries, self.flux_title, self.flux_description),
+            (
+                self.difference_timeseries,
+                self.difference_title,
+                self.difference_description,
+            ),
+        ]:
+            if timeseries:
+                gscript.run_command(
+                    "t.create",
+                    type="strds",
+                    temporaltype=self.temporaltype,
+                    output=timeseries,
+                    title=title,
+                    description=description,
+                    overwrite=True,
+                )
+
+    def run_step(self, evol):
+        """determine mode and run model for a single time step"""
+
+        erosion_deposition = None
+        sediment_flux = None
+        if self.mode == "simwe_mode":
+            (
+                evolved_elevation,
+                time,
+                depth,
+                erosion_deposition,
+                difference,
+            ) = evol.erosion_deposition()
+            # remove relative timestamps
+            # from r.sim.water and r.sim.sediment of the registered maps
+            if "depth" in self.outputs and evol.persist:
+                writer.submit(
+                    gscript.run_command, "r.timestamp", map=depth, date="none"
+                )
+            if erosion_deposition:
+                writer.submit(
+                    gscript.run_command,
+                    "r.timestamp",
+                    map=erosion_deposition,
+                    date="none",
+                )
+
+        elif self.mode == "usped_mode":
+            (
+                evolved_elevation,
+                time,
+                depth,
+                erosion_deposition,
+                difference,
+            ) = evol.usped()
+
+        elif self.mode == "rusle_mode":
+            (
+                evolved_elevation,
+                time,
+                depth,
+                sediment_flux,
+                difference,
+            ) = evol.rusle()
+
+        else:
+            raise RuntimeError(f"{self.mode} mode does not exist")
+
+        return (
+            evolved_elevation,
+            time,
+            depth,
+            erosion_deposition,
+            sediment_flux,
+            difference,
+        )
+
+    def select_output(self, evol, step, duration, force=False):
+        """write and register the maps of a time step over a duration (min)
+        at every nth step, at the output times within the step,
+        and when forced for the final state or a checkpoint"""
+
+        start = datetime.datetime.fromisoformat(evol.start)
+        end = start + datetime.timedelta(minutes=duration)
+        if self.since is None:
+            self.since = evol.start
+
+        # output times reached by the end of the step
+        reached = [time for time in self.output_times if time <= end]
+        self.output_times = self.output_times[len(reached) :]
+
+        evol.persist = (
+            force
+            or step % self.output_stride == 0
+            or any(time > start for time in reached)
+        )
+
+        return evol.persist
+
+    def register_step(
+        self,
+        registration,
+        start,
+        end,
+        evolved_elevation,
+        depth,
+        erosion_deposition,
+        sediment_flux,
+        difference,
+    ):
+        """collect the evolved maps of a time step for registration"""
+
+        registration.add(self.elevation_timeseries, evolved_elevation, start, end)
+        if depth and "depth" in self.outputs:
+            registration.add(self.depth_timeseries, depth, start, end)
+        if erosion_deposition:
+            registration.add(self.erdep_timeseries, erosion_deposition, start, end)
+        if sediment_flux:
+            registration.add(self.flux_timeseries, sediment_flux, start, end)
+        if difference:
+            registration.add(self.difference_timeseries, difference, start, end)
+
+    @profiled("checkpoint")
+    def save_checkpoint(self, evol, registration, records, elevation, depth):
+        """save the state of a series of rainfall events
+        after a number of rainfall records"""
+
+        # register the collected maps and wait until they are written
+        registration.flush()
+        writer.wait()
+
+        # save the state and the prefix of the temporary maps
+        # that a resumed run removes if this run is interrupted
+        if depth:
+            self.checkpoint_depth = evol.save_depth(
+                depth, self.prefixed("checkpoint_depth")
+            )
+        state = {
+            "precipitation": os.path.abspath(self.precipitation),
+            "mode": self.mode,
+            "records": records,
+            "elevation": elevation,
+            "depth": self.checkpoint_depth if depth else None,
+            "prefix": temporary.prefix,
+        }
+        with open(f"{self.checkpoint}.tmp", "w") as checkpoint:
+            json.dump(state, checkpoint, indent=2)
+        os.replace(f"{self.checkpoint}.tmp", self.checkpoint)
+
+    def load_checkpoint(self):
+        """load the state of a series of rainfall events"""
+
+        if not os.path.exists(self.checkpoint):
+            gscript.fatal(f"Checkpoint file {self.checkpoint} does not exist")
+        with open(self.checkpoint) as checkpoint:
+            state = json.load(checkpoint)
+        if (
+            state["precipitation"] != os.path.abspath(self.precipitation)
+            or state["mode"] != self.mode
+        ):
+            gscript.fatal(
+                f"Checkpoint file {self.checkpoint} is for "
+                f"{state['mode']} with {state['precipitation']}"
+            )
+
+        return state
+
+    def fast_forward(self, evol, registration, dry, elevation, step, force=False):
+        """evolve the landscape over consecutive dry records
+        in a single update by gravitational diffusion alone"""
+
+        evol.elevation = elevation
+        evol.start = dry[0]
+        duration = len(dry) * int(self.rain_interval)
+        with profiler.step(evol.start):
+            self.select_output(evol, step, duration, force)
+            evolved_elevation, time, difference = evol.dry_period(duration)
+            if evol.persist:
+                self.register_step(
+                    registration,
+                    self.since,
+                    time,
+                    evolved_elevation,
+                    None,
+                    None,
+                    None,
+                    difference,
+                )
+                self.since = None
+
+        return evolved_elevation
+
+    def rainfall_event(self):
+        """a dynamic, process-based landscape evolution model
+        of a single rainfall event that generates a timeseries
+        of digital elevation models"""
+
+        # assign local variables
+        iterations = int(self.rain_duration) / int(self.rain_interval)
+        net_difference = self.prefixed("net_difference")
+
+        # create the requested raster space time datasets
+        self.create_timeseries()
+
+        # collect the initial digital elevation model for registration
+        registration = Registration(self.register_batch)
+        end = datetime.datetime.strptime(
+            self.start, "%Y-%m-%d %H:%M:%S"
+        ) + datetime.timedelta(minutes=int(self.rain_interval))
+        registration.add(
+            self.elevation_timeseries, self.elevation, self.start, end.isoformat(" ")
         )
 
         # create evolution object
-        evol = Evolution(
+        if self.backend == "array":
+            evolution = ArrayEvolution
+        else:
+            evolution = Evolution
+        evol = evolution(
             elevation=self.elevation,
             precipitation=self.precipitation,
             start=self.start,
@@ -1479,125 +3728,70 @@ class DynamicEvolution:
             n=self.n,
             threads=self.threads,
             fill_depressions=self.fill_depressions,
+            edges=self.edges,
+            laplacian=self.laplacian,
+            fill_method=self.fill_method,
+            fill_epsilon=self.fill_epsilon,
+            accumulation=self.accumulation,
+            outputs=self.outputs,
+            max_change=self.max_change,
+            tile_size=self.tile_size,
+            run_id=self.run_id,
+            precision=self.precision,
+            quantum=self.quantum,
+            hydrology_tolerance=self.hydrology_tolerance,
+            walker_error=self.walker_error,
+            hydrology=self.hydrology,
         )
 
         i = 0
+        depth = None
         while i < iterations:
-
-            if i > 0:
-                # derive excess water (mm/hr) from rainfall rate (mm/hr)
-                # plus the depth (m) per rainfall interval (min)
-                gscript.mapcalc(
-                    f"{rain_excess}"
-                    f"={self.rain_intensity}"
-                    f"+{depth}"
-                    f"/1000."
-                    f"/{self.rain_interval}"
-                    f"*60.",
-                    overwrite=True,
-                )
-                # update excess rainfall
-                rain_intensity = "rain_intensity"
-                gscript.mapcalc(f"{rain_intensity} = {rain_excess}", overwrite=True)
-                evol.rain_intensity = rain_intensity
-
-            # determine mode and run model
-            if self.mode == "simwe_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    erosion_deposition,
-                    difference,
-                ) = evol.erosion_deposition()
-                # remove relative timestamps
-                # from r.sim.water and r.sim.sediment
-                gscript.run_command("r.timestamp", map=depth, date="none")
-                gscript.run_command("r.timestamp", map=erosion_deposition, date="none")
-
-            elif self.mode == "usped_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    erosion_deposition,
-                    difference,
-                ) = evol.usped()
-
-            elif self.mode == "rusle_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    sediment_flux,
-                    difference,
-                ) = evol.rusle()
-
-            else:
-                raise RuntimeError(f"{self.mode} mode does not exist")
-
-            # register the evolved maps
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.elevation_timeseries,
-                maps=evolved_elevation,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.depth_timeseries,
-                maps=depth,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
-            try:
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.erdep_timeseries,
-                    maps=erosion_deposition,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-            except (NameError, CalledModuleError):
-                pass
-            try:
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.flux_timeseries,
-                    maps=sediment_flux,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
+
+            # profile the time step
+            with profiler.step(evol.start):
+                # write and register the maps of selected steps
+                self.select_output(
+                    evol, i + 1, int(self.rain_interval), force=i + 1 >= iterations
                 )
-            except (NameError, CalledModuleError):
-                pass
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.difference_timeseries,
-                maps=difference,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
 
-            # remove temporary maps
-            gscript.run_command(
-                "g.remove", type="raster", name=["rain_excess"], flags="f"
-            )
+                if self.hydrology_tolerance is not None:
+                    # carry the depth over to the rainfall of the steps
+                    # that simulate the hydrology again
+                    evol.rain_intensity = self.rain_intensity
+                    evol.carried_depth = depth if i > 0 else None
+                elif depth is None:
+                    evol.rain_intensity = self.rain_intensity
+                else:
+                    # derive excess water (mm/hr) from rainfall rate (mm/hr)
+                    # plus the depth (m) per rainfall interval (min)
+                    evol.rain_intensity = evol.excess_rainfall(
+                        self.rain_intensity, depth
+                    )
+
+                # determine mode and run model
+                (
+                    evolved_elevation,
+                    time,
+                    depth,
+                    erosion_deposition,
+                    sediment_flux,
+                    difference,
+                ) = self.run_step(evol)
+
+                # collect the evolved maps for registration
+                if evol.persist:
+                    self.register_step(
+                        registration,
+                        self.since,
+                        time,
+                        evolved_elevation,
+                        depth,
+                        erosion_deposition,
+                        sediment_flux,
+                        difference,
+                    )
+                    self.since = None
 
             # update elevation
             evol.elevation = evolved_elevation
@@ -1608,6 +3802,11 @@ class DynamicEvolution:
             # advance iterator
             i = i + 1
 
+        # register the remaining maps
+        with profiler.step("registration"):
+            registration.flush()
+            writer.wait()
+
         # compute net elevation change
         gscript.mapcalc(
             f"{net_difference}={evol.elevation}-{self.elevation}", overwrite=True
@@ -1622,74 +3821,54 @@ class DynamicEvolution:
         a timeseries of digital elevation models"""
 
         # assign local temporal variables
-        datatype = "strds"
-        increment = str(self.rain_interval) + " minutes"
-        raster = "raster"
-        rain_excess = "rain_excess"
-        net_difference = "net_difference"
-
-        # create a raster space time dataset
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.elevation_timeseries,
-            title=self.elevation_title,
-            description=self.elevation_description,
-            overwrite=True,
-        )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.depth_timeseries,
-            title=self.depth_title,
-            description=self.depth_description,
-            overwrite=True,
-        )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.erdep_timeseries,
-            title=self.erdep_title,
-            description=self.erdep_description,
-            overwrite=True,
-        )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.flux_timeseries,
-            title=self.flux_title,
-            description=self.flux_description,
-            overwrite=True,
-        )
-        gscript.run_command(
-            "t.create",
-            type=datatype,
-            temporaltype=self.temporaltype,
-            output=self.difference_timeseries,
-            title=self.difference_title,
-            description=self.difference_description,
-            overwrite=True,
-        )
-
-        # register the initial digital elevation model
-        gscript.run_command(
-            "t.register",
-            type=raster,
-            input=self.elevation_timeseries,
-            maps=self.elevation,
-            start=self.start,
-            increment=increment,
-            flags="i",
-            overwrite=True,
-        )
+        net_difference = self.prefixed("net_difference")
+
+        # resume from the checkpoint or start a new series
+        registration = Registration(self.register_batch)
+        if self.resume:
+            state = self.load_checkpoint()
+            elevation = state["elevation"]
+            self.checkpoint_depth = state["depth"]
+
+            # remove the temporary maps left by the interrupted run
+            # except those already created by this run with the same prefix
+            if state.get("prefix"):
+                stale = [
+                    name
+                    for name in gscript.list_strings(
+                        "raster", pattern=f"{state['prefix']}*", mapset="."
+                    )
+                    if name.split("@")[0] not in temporary.names
+                ]
+                if stale:
+                    gscript.run_command(
+                        "g.remove", type="raster", name=stale, flags="f"
+                    )
+        else:
+            state = None
+            elevation = self.elevation
+
+            # create the requested raster space time datasets
+            self.create_timeseries()
+
+            # collect the initial digital elevation model for registration
+            end = datetime.datetime.strptime(
+                self.start, "%Y-%m-%d %H:%M:%S"
+            ) + datetime.timedelta(minutes=int(self.rain_interval))
+            registration.add(
+                self.elevation_timeseries,
+                self.elevation,
+                self.start,
+                end.isoformat(" "),
+            )
 
         # create evolution object
-        evol = Evolution(
-            elevation=self.elevation,
+        if self.backend == "array":
+            evolution = ArrayEvolution
+        else:
+            evolution = Evolution
+        evol = evolution(
+            elevation=elevation,
             precipitation=self.precipitation,
             start=self.start,
             rain_intensity=self.rain_intensity,
@@ -1712,6 +3891,20 @@ class DynamicEvolution:
             n=self.n,
             threads=self.threads,
             fill_depressions=self.fill_depressions,
+            edges=self.edges,
+            laplacian=self.laplacian,
+            fill_method=self.fill_method,
+            fill_epsilon=self.fill_epsilon,
+            accumulation=self.accumulation,
+            outputs=self.outputs,
+            max_change=self.max_change,
+            tile_size=self.tile_size,
+            run_id=self.run_id,
+            precision=self.precision,
+            quantum=self.quantum,
+            hydrology_tolerance=self.hydrology_tolerance,
+            walker_error=self.walker_error,
+            hydrology=self.hydrology,
         )
 
         # open txt file with precipitation data
@@ -1730,115 +3923,40 @@ class DynamicEvolution:
             # parse time and precipitation
             precip = csv.reader(csvfile, delimiter=",", skipinitialspace=True)
 
-            # initial run
-            initial = next(precip)
-            evol.start = initial[0]
-            evol.rain_intensity = "rain_intensity"
-            # compute rainfall intensity (mm/hr)
-            # from rainfall observation (mm)
-            gscript.mapcalc(
-                f"{evol.rain_intensity}"
-                f"={float(initial[1])}"
-                f"/{self.rain_interval}"
-                f"*60.",
-                overwrite=True,
-            )
-
-            # determine mode and run model
-            if self.mode == "simwe_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    erosion_deposition,
-                    difference,
-                ) = evol.erosion_deposition()
-                # remove relative timestamps
-                # from r.sim.water and r.sim.sediment
-                gscript.run_command("r.timestamp", map=depth, date="none")
-                gscript.run_command("r.timestamp", map=erosion_deposition, date="none")
-
-            elif self.mode == "usped_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    erosion_deposition,
-                    difference,
-                ) = evol.usped()
-
-            elif self.mode == "rusle_mode":
-                (
-                    evolved_elevation,
-                    time,
-                    depth,
-                    sediment_flux,
-                    difference,
-                ) = evol.rusle()
-
+            if state:
+                # skip the rainfall records processed before the checkpoint
+                records = state["records"]
+                for record in range(records):
+                    next(precip, None)
+                evolved_elevation = state["elevation"]
+                depth = evol.load_depth(state["depth"]) if state["depth"] else None
             else:
-                raise RuntimeError(f"{self.mode} mode does not exist")
+                records = 0
+                evolved_elevation = self.elevation
+                depth = None
+            checkpoint = records
 
-            # register the evolved maps
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.elevation_timeseries,
-                maps=evolved_elevation,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.depth_timeseries,
-                maps=depth,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
-            try:
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.erdep_timeseries,
-                    maps=erosion_deposition,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-            except (NameError, CalledModuleError):
-                pass
-            try:
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.flux_timeseries,
-                    maps=sediment_flux,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-            except (NameError, CalledModuleError):
-                pass
-            gscript.run_command(
-                "t.register",
-                type=raster,
-                input=self.difference_timeseries,
-                maps=difference,
-                start=evol.start,
-                increment=increment,
-                flags="i",
-                overwrite=True,
-            )
+            # start times of consecutive dry records
+            dry = []
 
             # run the landscape evolution model for each rainfall record
-            for row in precip:
+            for row, last in lookahead(precip):
+                records = records + 1
+
+                # collect records below the rain threshold
+                if self.rain_threshold is not None and (
+                    float(row[1]) <= self.rain_threshold
+                ):
+                    dry.append(row[0])
+                    continue
+
+                # fast-forward the dry period and reset the depth
+                if dry:
+                    evolved_elevation = self.fast_forward(
+                        evol, registration, dry, evolved_elevation, records - 1
+                    )
+                    depth = None
+                    dry = []
 
                 # update the elevation
                 evol.elevation = evolved_elevation
@@ -1846,134 +3964,84 @@ class DynamicEvolution:
                 # update time
                 evol.start = row[0]
 
-                # compute rainfall intensity (mm/hr)
-                # from rainfall observation (mm)
-                rain_intensity = "rain_intensity"
-                gscript.mapcalc(
-                    f"{rain_intensity}"
-                    f"={float(row[1])}"
-                    f"/{self.rain_interval}"
-                    f"*60.",
-                    overwrite=True,
-                )
-
-                # derive excess water (mm/hr) from rainfall rate (mm/hr)
-                # plus the depth (m) per rainfall interval (min)
-                gscript.mapcalc(
-                    f"{rain_excess}"
-                    f"={rain_intensity}"
-                    f"+{depth}"
-                    f"/1000."
-                    f"/{self.rain_interval}"
-                    f"*60.",
-                    overwrite=True,
-                )
-
-                # update excess rainfall
-                gscript.mapcalc(f"{rain_intensity} = {rain_excess}", overwrite=True)
-                evol.rain_intensity = rain_intensity
-
-                # determine mode and run model
-                if self.mode == "simwe_mode":
-                    (
-                        evolved_elevation,
-                        time,
-                        depth,
-                        erosion_deposition,
-                        difference,
-                    ) = evol.erosion_deposition()
-                    # remove relative timestamps
-                    # from r.sim.water and r.sim.sediment
-                    gscript.run_command("r.timestamp", map=depth, date="none")
-                    gscript.run_command(
-                        "r.timestamp", map=erosion_deposition, date="none"
+                # profile the time step
+                with profiler.step(evol.start):
+                    # write and register the maps of selected steps,
+                    # the final state, and the state of checkpoints
+                    checkpointing = (
+                        self.checkpoint
+                        and self.checkpoint_interval
+                        and records - checkpoint >= self.checkpoint_interval
+                    )
+                    self.select_output(
+                        evol,
+                        records,
+                        int(self.rain_interval),
+                        force=last or checkpointing,
                     )
 
-                elif self.mode == "usped_mode":
+                    # compute rainfall intensity (mm/hr)
+                    # from rainfall observation (mm)
+                    rain_intensity = float(row[1]) / int(self.rain_interval) * 60.0
+
+                    # derive excess water (mm/hr) from rainfall rate (mm/hr)
+                    # plus the depth (m) per rainfall interval (min),
+                    # or with warm starts carry the depth over
+                    # to the rainfall of the steps that simulate the hydrology
+                    if self.hydrology_tolerance is not None:
+                        evol.rain_intensity = rain_intensity
+                        evol.carried_depth = depth
+                    elif depth is None:
+                        evol.rain_intensity = rain_intensity
+                    else:
+                        evol.rain_intensity = evol.excess_rainfall(
+                            rain_intensity, depth
+                        )
+
+                    # determine mode and run model
                     (
                         evolved_elevation,
                         time,
                         depth,
                         erosion_deposition,
-                        difference,
-                    ) = evol.usped()
-
-                elif self.mode == "rusle_mode":
-                    (
-                        evolved_elevation,
-                        time,
-                        depth,
                         sediment_flux,
                         difference,
-                    ) = evol.rusle()
+                    ) = self.run_step(evol)
+
+                    # collect the evolved maps for registration
+                    if evol.persist:
+                        self.register_step(
+                            registration,
+                            self.since,
+                            time,
+                            evolved_elevation,
+                            depth,
+                            erosion_deposition,
+                            sediment_flux,
+                            difference,
+                        )
+                        self.since = None
+
+                    # save a checkpoint
+                    if checkpointing:
+                        self.save_checkpoint(
+                            evol, registration, records, evolved_elevation, depth
+                        )
+                        checkpoint = records
+
+            # fast-forward the last dry period
+            if dry:
+                evolved_elevation = self.fast_forward(
+                    evol, registration, dry, evolved_elevation, records, force=True
+                )
 
-                else:
-                    raise RuntimeError(f"{self.mode} mode does not exist")
+            # update the elevation
+            evol.elevation = evolved_elevation
 
-                # register the evolved maps
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.elevation_timeseries,
-                    maps=evolved_elevation,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.depth_timeseries,
-                    maps=depth,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-                try:
-                    gscript.run_command(
-                        "t.register",
-                        type=raster,
-                        input=self.erdep_timeseries,
-                        maps=erosion_deposition,
-                        start=evol.start,
-                        increment=increment,
-                        flags="i",
-                        overwrite=True,
-                    )
-                except (NameError, CalledModuleError):
-                    pass
-                try:
-                    gscript.run_command(
-                        "t.register",
-                        type=raster,
-                        input=self.flux_timeseries,
-                        maps=sediment_flux,
-                        start=evol.start,
-                        increment=increment,
-                        flags="i",
-                        overwrite=True,
-                    )
-                except (NameError, CalledModuleError):
-                    pass
-                gscript.run_command(
-                    "t.register",
-                    type=raster,
-                    input=self.difference_timeseries,
-                    maps=difference,
-                    start=evol.start,
-                    increment=increment,
-                    flags="i",
-                    overwrite=True,
-                )
-                try:
-                    # remove temporary maps
-                    gscript.run_command(
-                        "g.remove", type="raster", name=["rain_excess"], flags="f"
-                    )
-                except (CalledModuleError):
-                    pass
+            # register the remaining maps
+            with profiler.step("registration"):
+                registration.flush()
+                writer.wait()
 
             # compute net elevation change
             gscript.mapcalc(
@@ -1983,53 +4051,1164 @@ class DynamicEvolution:
                 "r.colors", map=net_difference, rules="-", stdin=difference_colors
             )
 
+            # remove the water depth saved for the checkpoints
+            if self.checkpoint_depth:
+                gscript.run_command(
+                    "g.remove", type="raster", name=self.checkpoint_depth, flags="f"
+                )
+
+
+class Registration:
+    """collect maps with their start and end times
+    and register them in space time raster datasets in batches"""
+
+    def __init__(self, batch=0):
+        self.batch = batch
+        self.maps = {}
+
+    def add(self, timeseries, raster, start, end):
+        """collect a map and register the batch
+        of its space time raster dataset once it is full"""
+
+        self.maps.setdefault(timeseries, []).append((raster, start, end))
+        if self.batch and len(self.maps[timeseries]) >= self.batch:
+            self.register(timeseries)
+
+    def register(self, timeseries):
+        """register the collected maps of a space time raster dataset
+        in the background once they are written"""
+
+        maps = self.maps.pop(timeseries, None)
+        if maps:
+            writer.submit(self.register_maps, timeseries, maps)
+
+    @profiled("registration")
+    def register_maps(self, timeseries, maps):
+        """register maps in a space time raster dataset
+        from a registration file with a single call to t.register"""
+
+        registration_file = gscript.tempfile()
+        with open(registration_file, "w") as registration:
+            for raster, start, end in maps:
+                registration.write(f"{raster}|{start}|{end}\n")
+        try:
+            gscript.run_command(
+                "t.register",
+                type="raster",
+                input=timeseries,
+                file=registration_file,
+                overwrite=True,
+            )
+        finally:
+            gscript.try_remove(registration_file)
+
+    def flush(self):
+        """register the collected maps of every space time raster dataset"""
+
+        for timeseries in list(self.maps):
+            self.register(timeseries)
+
+
+def read_array(raster):
+    """read a raster map into a numpy array with nulls as nan"""
+
+    array = garray.array()
+    array.read(raster, null=np.nan)
+
+    return np.array(array, dtype=np.float64)
+
+
+def write_array(
+    array, raster, color=None, rules=None, flags="", precision="double", quantum=None
+):
+    """write a numpy array as a raster map with nan as nulls
+    in single or double precision or scaled by a quantum as integers
+    and optionally set its color table"""
+
+    if quantum:
+        # integer multiples of the quantum with the smallest integer as null
+        null = np.iinfo(np.int32).min
+        output = garray.array(dtype=np.int32)
+        output[...] = np.where(
+            np.isnan(array),
+            null,
+            np.clip(np.rint(array / quantum), null + 1, np.iinfo(np.int32).max),
+        )
+    else:
+        null = np.nan
+        output = garray.array(dtype=np.float32 if precision == "float" else np.float64)
+        output[...] = array
+    output.write(raster, null=null, overwrite=True)
+
+    # set color table
+    if color:
+        gscript.run_command("r.colors", map=raster, color=color, flags=flags)
+    elif rules:
+        gscript.write_command("r.colors", map=raster, rules="-", stdin=rules)
+
+    return raster
+
+
+def neighbor(array, row, col):
+    """grid of the neighbors at a row and column offset
+    with neighbors outside the region or null replaced by the center cell"""
+
+    rows, cols = array.shape
+    padded = np.pad(array, 1, mode="constant", constant_values=np.nan)
+    cell = padded[1 + row : 1 + row + rows, 1 + col : 1 + col + cols]
+
+    return np.where(np.isnan(cell), array, cell)
+
+
+def neighborhood(array):
+    """3x3 moving window over a grid as the nine shifted cells c1...c9
+    from the northwest to the southeast corner, with neighbors outside
+    the region or null replaced by the center cell as in r.slope.aspect -e"""
+
+    return [neighbor(array, row, col) for row in (-1, 0, 1) for col in (-1, 0, 1)]
+
+
+def partial_derivatives(array, ewres, nsres):
+    """first order partial derivatives dz/dx and dz/dy
+    from the weighted differences used by r.slope.aspect"""
+
+    c1, c2, c3, c4, c5, c6, c7, c8, c9 = neighborhood(array)
+    dx = ((c3 + 2 * c6 + c9) - (c1 + 2 * c4 + c7)) / (8 * ewres)
+    dy = ((c1 + 2 * c2 + c3) - (c7 + 2 * c8 + c9)) / (8 * nsres)
+
+    # keep null cells null
+    nulls = np.isnan(c5)
+    dx[nulls] = np.nan
+    dy[nulls] = np.nan
+
+    return dx, dy
+
+
+def second_derivatives(array, ewres, nsres):
+    """second order partial derivatives dxx and dyy
+    with the sign convention used by r.slope.aspect"""
+
+    c1, c2, c3, c4, c5, c6, c7, c8, c9 = neighborhood(array)
+    corners = c1 + c3 + c7 + c9 - 8 * c5
+    dxx = -(corners + 4 * (c4 + c6) - 2 * (c2 + c8)) / (6 * ewres**2)
+    dyy = -(corners + 4 * (c2 + c8) - 2 * (c4 + c6)) / (6 * nsres**2)
+
+    return dxx, dyy
+
+
+def rusle_kernel(
+    elevation,
+    depth,
+    r_factor,
+    k_factor,
+    c_factor,
+    mass,
+    m,
+    n,
+    erdepmax,
+    duration,
+    ewres,
+    nsres,
+):
+    """fused RUSLE step that computes the slope, the topographic factor,
+    the sediment flux with outliers filtered, and the evolved elevation
+    in one vectorized pass, updating a few buffers in place
+    instead of allocating a new grid for every term
+
+    returns sediment flux (kg/ms) and evolved elevation (m)"""
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # sine of the slope angle from the partial derivatives
+        # sin(atan(g)) = g / sqrt(1 + g^2)
+        sine, buffer = partial_derivatives(elevation, ewres, nsres)
+        np.hypot(sine, buffer, out=sine)
+        np.multiply(sine, sine, out=buffer)
+        buffer += 1.0
+        np.sqrt(buffer, out=buffer)
+        sine /= buffer
+
+        # dimensionless topographic factor
+        # LS = (m + 1) * (depth / 22.1)^m * (sin(slope) / 5.14)^n
+        sine /= 5.14
+        np.power(sine, n, out=sine)
+        np.divide(depth, 22.1, out=buffer)
+        np.power(buffer, m, out=buffer)
+        buffer *= sine
+
+        # sediment flow E = R * K * LS * C converted
+        # from tons/ha/yr to kg/m^2s
+        buffer *= (m + 1.0) * 1000.0 / 10000.0 / 31557600.0
+        buffer *= r_factor
+        buffer *= k_factor
+        buffer *= c_factor
+
+        # filter outliers
+        flux = np.minimum(buffer, erdepmax, out=buffer)
+
+        # change in elevation (m)
+        # = change in time (s) * sediment flux (kg/ms)
+        # / mass of sediment per unit area (kg/m^2)
+        np.multiply(flux, duration, out=sine)
+        sine /= mass
+        evolved = np.subtract(elevation, sine, out=sine)
+
+    return flux, evolved
+
+
+def divergence(qsx, qsy, ewres, nsres, edges="center"):
+    """divergence of a vector field with x pointing east and y pointing north
+    from central differences of the neighboring cells,
+    with neighbors outside the region replaced by the center cell (center),
+    one-sided differences at the edges (onesided),
+    or the edges of the region set to null (null)"""
+
+    qsxdx = (neighbor(qsx, 0, 1) - neighbor(qsx, 0, -1)) / (2 * ewres)
+    qsydy = (neighbor(qsy, -1, 0) - neighbor(qsy, 1, 0)) / (2 * nsres)
+
+    # handle the edges of the region
+    if edges == "onesided":
+        qsxdx[:, [0, -1]] *= 2
+        qsydy[[0, -1], :] *= 2
+    result = qsxdx + qsydy
+    if edges == "null":
+        result[[0, -1], :] = np.nan
+        result[:, [0, -1]] = np.nan
+
+    return result
+
+
+def usped_kernel(
+    elevation,
+    depth,
+    r_factor,
+    k_factor,
+    c_factor,
+    m,
+    n,
+    erdepmin,
+    erdepmax,
+    ewres,
+    nsres,
+    edges="center",
+):
+    """USPED step that computes the sediment flow vector field
+    and its divergence in one vectorized pass,
+    taking the direction of flow from the gradient
+    instead of the cosine and sine of the aspect
+
+    returns net erosion-deposition (kg/m^2s) with outliers filtered"""
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dx, dy = partial_derivatives(elevation, ewres, nsres)
+        gradient = np.hypot(dx, dy)
+
+        # sediment flow at transport capacity T = R * K * C * LST
+        # converted from tons/ha/yr to kg/m^2s
+        # with sin(slope) = g / sqrt(1 + g^2)
+        sine = gradient / np.sqrt(1.0 + gradient * gradient)
+        flux = (
+            r_factor
+            * k_factor
+            * c_factor
+            * (depth**m)
+            * (sine**n)
+            * (1000.0 / 10000.0 / 31557600.0)
+        )
+
+        # sediment flow rate in x and y directions (m^2/s)
+        # with cos(aspect) = -dz/dx / g and sin(aspect) = -dz/dy / g
+        scale = np.divide(flux, gradient, out=np.zeros_like(flux), where=gradient > 0)
+        qsx = -dx * scale
+        qsy = -dy * scale
+
+        # net erosion-deposition as divergence of sediment flow
+        erdep = divergence(qsx, qsy, ewres, nsres, edges)
+
+    # filter outliers
+    return np.clip(erdep, erdepmin, erdepmax)
+
+
+def laplacian(array, ewres, nsres, stencil="nine_point"):
+    """laplacian of a grid from a 5-point stencil of the direct neighbors
+    or from the 9-point stencil of the second order partial derivatives
+    used by r.slope.aspect, with neighbors outside the region
+    or null replaced by the center cell"""
+
+    if stencil == "nine_point":
+        dxx, dyy = second_derivatives(array, ewres, nsres)
+        return -(dxx + dyy)
+
+    return (neighbor(array, 0, -1) - 2 * array + neighbor(array, 0, 1)) / ewres**2 + (
+        neighbor(array, -1, 0) - 2 * array + neighbor(array, 1, 0)
+    ) / nsres**2
+
+
+def laplacian_expression(raster, stencil="nine_point"):
+    """r.mapcalc expression for the laplacian of a raster map
+    from a 5-point or 9-point stencil, with neighbors outside the region
+    or null replaced by the center cell"""
+
+    # neighbors c1...c9 from the northwest to the southeast corner
+    c1, c2, c3, c4, c5, c6, c7, c8, c9 = [
+        f"if(isnull({raster}[{row},{col}]),{raster},{raster}[{row},{col}])"
+        for row in (-1, 0, 1)
+        for col in (-1, 0, 1)
+    ]
+
+    if stencil == "nine_point":
+        corners = f"({c1}+{c3}+{c7}+{c9}-8*{raster})"
+        return (
+            f"({corners}+4*({c4}+{c6})-2*({c2}+{c8}))/(6*ewres()^2)"
+            f"+({corners}+4*({c2}+{c8})-2*({c4}+{c6}))/(6*nsres()^2)"
+        )
+
+    return f"({c4}-2*{raster}+{c6})/(ewres()^2)" f"+({c2}-2*{raster}+{c8})/(nsres()^2)"
+
+
+def priority_flood(elevation, epsilon=0.0):
+    """fill depressions with the priority-flood algorithm
+    flooding inward from the edges of the region and null cells,
+    optionally imposing an epsilon gradient across filled flats"""
+
+    rows, cols = elevation.shape
+
+    # pad the grid with a border of null cells
+    # so that neighbors can be found from offsets of the flat index
+    padded = np.pad(elevation, 1, mode="constant", constant_values=np.nan)
+    nulls = np.isnan(padded)
+    width = cols + 2
+    offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+    # seed the queue with cells next to the edges of the region or null cells
+    edges = np.zeros_like(nulls)
+    for offset in offsets:
+        edges |= np.roll(nulls, offset)
+    edges &= ~nulls
+    seeds = np.flatnonzero(edges)
+
+    surface = padded.ravel().tolist()
+    closed = bytearray(nulls.ravel().tobytes())
+    for cell in seeds:
+        closed[cell] = 1
+    queue = [(surface[cell], int(cell)) for cell in seeds]
+    heapq.heapify(queue)
+    pits = collections.deque()
+
+    while queue or pits:
+        # cells raised inside depressions bypass the priority queue
+        if pits:
+            cell = pits.popleft()
+            level = surface[cell]
+        else:
+            level, cell = heapq.heappop(queue)
+        spill = level + epsilon
+        for offset in offsets:
+            other = cell + offset
+            if closed[other]:
+                continue
+            closed[other] = 1
+            if surface[other] <= spill:
+                # raise cells inside depressions to the spill elevation
+                if epsilon or surface[other] < level:
+                    surface[other] = spill
+                pits.append(other)
+            else:
+                heapq.heappush(queue, (surface[other], other))
+
+    filled = np.array(surface).reshape(rows + 2, cols + 2)
+
+    return filled[1:-1, 1:-1]
+
+
+def flow_receivers(elevation, ewres, nsres):
+    """flat index of the steepest downslope neighbor of each cell (D8)
+    with cells without a lower neighbor draining to themselves"""
+
+    rows, cols = elevation.shape
+    index = np.arange(rows * cols).reshape(rows, cols)
+    padded = np.pad(elevation, 1, mode="constant", constant_values=np.nan)
+    receivers = index.copy()
+    steepest = np.zeros(elevation.shape)
+    with np.errstate(invalid="ignore"):
+        for row in (-1, 0, 1):
+            for col in (-1, 0, 1):
+                if row == 0 and col == 0:
+                    continue
+                other = padded[1 + row : 1 + row + rows, 1 + col : 1 + col + cols]
+                drop = (elevation - other) / np.hypot(row * nsres, col * ewres)
+                steeper = drop > steepest
+                steepest[steeper] = drop[steeper]
+                receivers[steeper] = index[steeper] + row * cols + col
+
+    return receivers.ravel()
+
+
+def accumulate(receivers, accumulation, cells):
+    """accumulate flow down the receivers of a subset of cells
+    in topological order, starting from the cells without donors,
+    with the flow from donors outside the subset already included"""
+
+    inside = np.zeros(receivers.size, dtype=bool)
+    inside[cells] = True
+    downstream = receivers[cells]
+    draining = (downstream != cells) & inside[downstream]
+    donors = np.bincount(downstream[draining], minlength=receivers.size)
+    frontier = cells[donors[cells] == 0]
+    while frontier.size:
+        frontier = frontier[receivers[frontier] != frontier]
+        downstream = receivers[frontier]
+        frontier = frontier[inside[downstream]]
+        downstream = receivers[frontier]
+        np.add.at(accumulation, downstream, accumulation[frontier])
+        np.subtract.at(donors, downstream, 1)
+        downstream = np.unique(downstream)
+        frontier = downstream[donors[downstream] == 0]
+
+    return accumulation
+
+
+class FlowAccumulation:
+    """D8 flow accumulation that keeps the flow directions and accumulation
+    of the previous step and only recomputes the downstream subgraphs
+    of the cells whose receiver changed"""
+
+    def __init__(self, ewres, nsres):
+        self.ewres = ewres
+        self.nsres = nsres
+        self.receivers = None
+        self.accumulation = None
+
+    def update(self, elevation):
+        """update the flow accumulation (cells) for a new elevation"""
+
+        receivers = flow_receivers(elevation, self.ewres, self.nsres)
+        nulls = np.isnan(elevation).ravel()
+
+        if self.receivers is None:
+            # accumulate flow over the whole grid
+            accumulation = np.where(nulls, 0.0, 1.0)
+            cells = np.arange(receivers.size)
+            self.accumulation = accumulate(receivers, accumulation, cells)
+        else:
+            # find the cells downstream of changed receivers
+            # along both the previous and the new flow paths
+            changed = np.flatnonzero(receivers != self.receivers)
+            affected = np.zeros(receivers.size, dtype=bool)
+            frontier = np.union1d(self.receivers[changed], receivers[changed])
+            while frontier.size:
+                frontier = frontier[~affected[frontier]]
+                affected[frontier] = True
+                frontier = np.union1d(self.receivers[frontier], receivers[frontier])
+            cells = np.flatnonzero(affected)
+
+            # reset the affected cells and add the flow
+            # from unaffected donors that did not change
+            accumulation = self.accumulation
+            accumulation[cells] = np.where(nulls[cells], 0.0, 1.0)
+            donors = np.flatnonzero(
+                ~affected & (receivers != np.arange(receivers.size))
+            )
+            donors = donors[affected[receivers[donors]]]
+            np.add.at(accumulation, receivers[donors], accumulation[donors])
+
+            # accumulate flow over the affected subgraph
+            self.accumulation = accumulate(receivers, accumulation, cells)
+
+        self.receivers = receivers
+        accumulation = self.accumulation.reshape(elevation.shape).copy()
+        accumulation[np.isnan(elevation)] = np.nan
+
+        return accumulation
+
+
+def tiles(shape, size):
+    """row and column bounds of the tiles of a grid"""
+
+    rows, cols = shape
+    for row in range(0, rows, size):
+        for col in range(0, cols, size):
+            yield row, min(row + size, rows), col, min(col + size, cols)
+
+
+def halo_window(shape, bounds, halo):
+    """bounds of a tile extended by a halo of neighboring cells
+    clipped to the grid"""
+
+    rows, cols = shape
+    row0, row1, col0, col1 = bounds
+
+    return (
+        max(row0 - halo, 0),
+        min(row1 + halo, rows),
+        max(col0 - halo, 0),
+        min(col1 + halo, cols),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def process_pool(processes):
+    """pool of worker processes shared by the tiled stages of a run"""
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes, mp_context=context
+    )
+    atexit.register(pool.shutdown)
+
+    return pool
+
+
+def tiled(function, arrays, size, halo, pool):
+    """apply a local function to the tiles of a grid in a process pool,
+    passing each tile with a halo of neighboring cells as wide as the stencil
+    of the function and keeping the cells inside the tile,
+    with scalar arguments passed unchanged
+
+    returns a grid or a tuple of grids like the function"""
+
+    shape = next(np.shape(array) for array in arrays if np.ndim(array) == 2)
+    jobs = []
+    for bounds in tiles(shape, size):
+        top, bottom, left, right = halo_window(shape, bounds, halo)
+        args = [
+            array[top:bottom, left:right] if np.ndim(array) == 2 else array
+            for array in arrays
+        ]
+        jobs.append((bounds, (top, left), pool.submit(function, *args)))
+
+    # assemble the tiles without their halos
+    results = None
+    for (row0, row1, col0, col1), (top, left), job in jobs:
+        outputs = job.result()
+        single = not isinstance(outputs, tuple)
+        if single:
+            outputs = (outputs,)
+        if results is None:
+            results = [np.empty(shape) for output in outputs]
+        for result, output in zip(results, outputs):
+            result[row0:row1, col0:col1] = output[
+                row0 - top : row1 - top, col0 - left : col1 - left
+            ]
+
+    return results[0] if single else tuple(results)
+
+
+def accumulate_tile(elevation, ewres, nsres, halo):
+    """D8 flow accumulation inside a tile with a halo of one cell
+
+    returns the accumulation of the cells inside the tile,
+    the receivers inside the tile with cells draining out of the tile
+    draining to themselves, the cell where the flow of each cell
+    leaves the tile or ends, and the cells that drain out of the tile
+    with the row and column of their receivers relative to the tile"""
+
+    top, bottom, left, right = halo
+    receivers = flow_receivers(elevation, ewres, nsres)
+    rows, cols = elevation.shape
+    rows, cols = rows - top - bottom, cols - left - right
+
+    # receivers of the cells inside the tile
+    grid = np.arange(elevation.size).reshape(elevation.shape)
+    inside = grid[top : top + rows, left : left + cols].ravel()
+    receiver_rows = receivers[inside] // elevation.shape[1] - top
+    receiver_cols = receivers[inside] % elevation.shape[1] - left
+    within = (
+        (receiver_rows >= 0)
+        & (receiver_rows < rows)
+        & (receiver_cols >= 0)
+        & (receiver_cols < cols)
+    )
+    cells = np.arange(rows * cols)
+    local = np.where(within, receiver_rows * cols + receiver_cols, cells)
+    outlets = np.flatnonzero(~within)
+
+    # accumulate flow inside the tile
+    nulls = np.isnan(elevation[top : top + rows, left : left + cols]).ravel()
+    accumulation = accumulate(local, np.where(nulls, 0.0, 1.0), cells)
+
+    # follow the flow of each cell to where it leaves the tile or ends
+    ends = local.copy()
+    while True:
+        following = ends[ends]
+        if np.array_equal(following, ends):
+            break
+        ends = following
+
+    return (
+        accumulation,
+        local,
+        ends,
+        outlets,
+        receiver_rows[outlets],
+        receiver_cols[outlets],
+    )
+
+
+def tiled_accumulation(elevation, ewres, nsres, size, pool):
+    """D8 flow accumulation computed in tiles in a process pool
+    and merged with the graph of the flow between tiles
+
+    each tile accumulates its own flow, the flow leaving each tile
+    is accumulated over the graph of the cells where it leaves and enters tiles,
+    and the flow entering each tile is then routed down its own flow paths"""
+
+    shape = elevation.shape
+    rows, cols = shape
+    bounds = list(tiles(shape, size))
+    jobs = []
+    for row0, row1, col0, col1 in bounds:
+        top, bottom, left, right = halo_window(shape, (row0, row1, col0, col1), 1)
+        halo = (row0 - top, bottom - row1, col0 - left, right - col1)
+        jobs.append(
+            pool.submit(
+                accumulate_tile,
+                elevation[top:bottom, left:right],
+                ewres,
+                nsres,
+                halo,
+            )
+        )
+    results = [job.result() for job in jobs]
+
+    # global index of the cells of each tile
+    def global_index(tile, cells):
+        row0, row1, col0, col1 = bounds[tile]
+        width = col1 - col0
+        return (row0 + cells // width) * cols + col0 + cells % width
+
+    def tile_index(cells):
+        row, col = cells // cols, cells % cols
+        tile = (row // size) * len(range(0, cols, size)) + col // size
+        return (
+            tile,
+            (row % size)
+            * (np.minimum((col // size) * size + size, cols) - (col // size) * size)
+            + col % size,
+        )
+
+    # cells that drain out of their tiles and the cells they drain to
+    outlets, targets, flow = [], [], []
+    for tile, (accumulation, local, ends, cells, target_rows, target_cols) in enumerate(
+        results
+    ):
+        row0, row1, col0, col1 = bounds[tile]
+        outlets.append(global_index(tile, cells))
+        targets.append((row0 + target_rows) * cols + col0 + target_cols)
+        flow.append(accumulation[cells])
+    outlets = np.concatenate(outlets)
+    targets = np.concatenate(targets)
+    flow = np.concatenate(flow)
+
+    # accumulate the flow leaving each tile over the graph of outlets
+    # where each outlet drains to the outlet reached from its target
+    if outlets.size:
+        order = np.argsort(outlets)
+        ends = np.empty(targets.size, dtype=np.int64)
+        tile, cells = tile_index(targets)
+        for index in np.unique(tile):
+            here = tile == index
+            ends[here] = global_index(index, results[index][2][cells[here]])
+        position = np.searchsorted(outlets, ends, sorter=order)
+        position = order[np.minimum(position, outlets.size - 1)]
+        nodes = np.arange(outlets.size)
+        downstream = np.where(outlets[position] == ends, position, nodes)
+        flow = accumulate(downstream, flow, nodes)
+
+    # route the flow entering each tile down its flow paths
+    accumulation = np.empty(shape)
+    inflows = np.zeros(rows * cols)
+    np.add.at(inflows, targets, flow)
+    jobs = []
+    for index, (row0, row1, col0, col1) in enumerate(bounds):
+        local, inflow = results[index][1], inflows.reshape(shape)[row0:row1, col0:col1]
+        if inflow.any():
+            job = pool.submit(accumulate, local, inflow.ravel(), np.arange(local.size))
+        else:
+            job = None
+        jobs.append(job)
+    for index, (row0, row1, col0, col1) in enumerate(bounds):
+        tile = results[index][0]
+        if jobs[index] is not None:
+            tile = tile + jobs[index].result()
+        accumulation[row0:row1, col0:col1] = tile.reshape(row1 - row0, col1 - col0)
+    accumulation[np.isnan(elevation)] = np.nan
+
+    return accumulation
+
+
+def flood_tile(elevation, halo):
+    """priority-flood depression filling inside a tile with a halo of one cell,
+    flooding inward from the edges of the tile and null cells
+    and labeling the watershed of each cell by the edge cell it was flooded from,
+    with the cells flooded from null cells or the edges of the region labeled 0
+
+    returns the filled elevation, the labels, and the number of labels"""
+
+    top, bottom, left, right = halo
+    rows, cols = elevation.shape
+    rows, cols = rows - top - bottom, cols - left - right
+
+    # pad the tile with null cells outside the region
+    padded = np.pad(
+        elevation,
+        ((1 - top, 1 - bottom), (1 - left, 1 - right)),
+        mode="constant",
+        constant_values=np.nan,
+    )
+    nulls = np.isnan(padded)
+    width = cols + 2
+    offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+    # the halo of the tile is closed like null cells
+    inside = np.zeros_like(nulls)
+    inside[1:-1, 1:-1] = True
+    border = ~inside
+    closed = border | nulls
+    edges = np.zeros_like(nulls)
+    oceans = np.zeros_like(nulls)
+    for offset in offsets:
+        edges |= np.roll(border, offset)
+        oceans |= np.roll(nulls, offset)
+    seeds = np.flatnonzero((edges | oceans) & ~closed)
+
+    # label each seed by its own watershed
+    # or by the ocean for seeds next to null cells
+    labels = np.full(padded.size, -1, dtype=np.int64)
+    ocean = oceans.ravel()[seeds]
+    labels[seeds] = np.where(ocean, 0, np.cumsum(~ocean))
+    count = int(np.count_nonzero(~ocean))
+    labels = labels.tolist()
+
+    surface = padded.ravel().tolist()
+    closed = bytearray(closed.ravel().tobytes())
+    for cell in seeds:
+        closed[cell] = 1
+    queue = [(surface[cell], int(cell)) for cell in seeds]
+    heapq.heapify(queue)
+    pits = collections.deque()
+
+    while queue or pits:
+        # cells raised inside depressions bypass the priority queue
+        if pits:
+            cell = pits.popleft()
+            level = surface[cell]
+        else:
+            level, cell = heapq.heappop(queue)
+        label = labels[cell]
+        for offset in offsets:
+            other = cell + offset
+            if closed[other]:
+                continue
+            closed[other] = 1
+            labels[other] = label
+            if surface[other] <= level:
+                # raise cells inside depressions to the spill elevation
+                surface[other] = level
+                pits.append(other)
+            else:
+                heapq.heappush(queue, (surface[other], other))
+
+    filled = np.array(surface).reshape(rows + 2, cols + 2)[1:-1, 1:-1]
+    labels = np.array(labels).reshape(rows + 2, cols + 2)[1:-1, 1:-1]
+
+    return filled, labels, count
+
+
+def tiled_priority_flood(elevation, size, pool):
+    """fill depressions with the priority-flood algorithm in tiles
+    in a process pool, merged with the graph of the watersheds
+    of the edges of the tiles (Barnes 2016)
+
+    each tile is flooded from its own edges, the spill elevations
+    between neighboring watersheds are flooded from the ocean of null cells
+    and the edges of the region, and each watershed is then raised
+    to the level at which it spills to the ocean"""
+
+    shape = elevation.shape
+    jobs = []
+    bounds = list(tiles(shape, size))
+    for row0, row1, col0, col1 in bounds:
+        top, bottom, left, right = halo_window(shape, (row0, row1, col0, col1), 1)
+        halo = (row0 - top, bottom - row1, col0 - left, right - col1)
+        jobs.append(pool.submit(flood_tile, elevation[top:bottom, left:right], halo))
+
+    # assemble the tiles with labels unique across the tiles
+    filled = np.empty(shape)
+    labels = np.empty(shape, dtype=np.int64)
+    offset = 0
+    for (row0, row1, col0, col1), job in zip(bounds, jobs):
+        tile, tile_labels, count = job.result()
+        filled[row0:row1, col0:col1] = tile
+        labels[row0:row1, col0:col1] = np.where(
+            tile_labels > 0, tile_labels + offset, tile_labels
+        )
+        offset += count
+
+    # spill elevations between neighboring cells in different watersheds
+    rows, cols = shape
+    pairs, spills = [], []
+    for row, col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        first = (slice(0, rows - row), slice(max(-col, 0), cols - max(col, 0)))
+        second = (slice(row, rows), slice(max(col, 0), cols + min(col, 0)))
+        neighboring = (
+            (labels[first] != labels[second])
+            & (labels[first] >= 0)
+            & (labels[second] >= 0)
+        )
+        a, b = labels[first][neighboring], labels[second][neighboring]
+        pairs.append(np.minimum(a, b) * (offset + 1) + np.maximum(a, b))
+        spills.append(
+            np.maximum(filled[first][neighboring], filled[second][neighboring])
+        )
+    pairs, spills = np.concatenate(pairs), np.concatenate(spills)
+
+    # lowest spill elevation between each pair of neighboring watersheds
+    order = np.lexsort((spills, pairs))
+    pairs, first = np.unique(pairs[order], return_index=True)
+    spills = spills[order][first]
+    graph = collections.defaultdict(list)
+    for pair, level in zip(pairs.tolist(), spills.tolist()):
+        a, b = divmod(pair, offset + 1)
+        graph[a].append((b, level))
+        graph[b].append((a, level))
+
+    # flood the graph of watersheds from the ocean
+    levels = [math.inf] * (offset + 1)
+    levels[0] = -math.inf
+    queue = [(-math.inf, 0)]
+    while queue:
+        level, label = heapq.heappop(queue)
+        if level > levels[label]:
+            continue
+        for other, spill in graph[label]:
+            spill = max(level, spill)
+            if spill < levels[other]:
+                levels[other] = spill
+                heapq.heappush(queue, (spill, other))
+
+    # raise each watershed to the level at which it spills to the ocean
+    levels = np.array(levels)
+    watersheds = labels >= 0
+    filled[watersheds] = np.fmax(filled[watersheds], levels[labels[watersheds]])
+
+    return filled
+
+
+def diffusion_substeps(duration, grav_diffusion, density, ewres, nsres):
+    """number of substeps of explicit gravitational diffusion
+    over a duration (min) that keep the laplacian stencil stable"""
+
+    coefficient = duration * 60.0 / density * grav_diffusion
+    return max(1, math.ceil(coefficient * (2.0 / ewres**2 + 2.0 / nsres**2)))
+
+
+@functools.lru_cache(maxsize=None)
+def uniform_r_factor(rain_intensity, rain_interval):
+    """event-based erosivity (R) factor (MJ mm ha^-1 hr^-1 yr^-1)
+    of a uniform rainfall intensity (mm/hr) over an interval (min)"""
+
+    # derive rainfall energy (MJ ha^-1 mm^-1)
+    rain_energy = 0.29 * (1.0 - (0.72 * math.exp(-0.05 * rain_intensity)))
+
+    # derive rainfall volume (mm)
+    rain_volume = rain_intensity * (rain_interval / 60.0)
+
+    # derive event erosivity index (MJ mm ha^-1 hr^-1)
+    erosivity = (rain_energy * rain_volume) * rain_intensity
+
+    # derive R factor (MJ mm ha^-1 hr^-1 yr^1)
+    return erosivity / (rain_interval / 525600.0)
+
+
+def slope_degrees(dx, dy):
+    """slope in degrees from partial derivatives"""
+
+    return np.degrees(np.arctan(np.hypot(dx, dy)))
+
+
+def overland_velocity(dx, dy, mannings, depth):
+    """east and south components and speed (m/s) of overland flow
+    down the gradient at a water depth (m) with manning's equation"""
+
+    gradient = np.hypot(dx, dy)
+    speed = depth ** (2.0 / 3.0) * np.sqrt(gradient) / mannings
+    with np.errstate(divide="ignore", invalid="ignore"):
+        east = np.where(gradient > 0, -dx / gradient * speed, 0.0)
+        south = np.where(gradient > 0, dy / gradient * speed, 0.0)
+
+    # keep null cells null
+    nulls = np.isnan(speed)
+    east[nulls] = np.nan
+    south[nulls] = np.nan
+
+    return east, south, speed
+
+
+def diffusive_wave(
+    elevation, gradient, rain, mannings, ewres, nsres, duration, courant=0.25
+):
+    """water depth (m) after a duration (s) of rainfall excess (m/s)
+    routed as overland flow between neighboring cells
+    with the discharge of manning's equation down the slope
+    of the water surface, in explicit time steps limited by the courant number
+
+    water leaves the region over its edges down the gradient (m/m)
+    of the edge cells, while null cells are walls"""
+
+    # cells outside the edges lower than the edge cells by their gradient
+    z = np.pad(elevation, 1, mode="edge")
+    outside = np.pad(gradient, 1, mode="edge")
+    z[0, :] -= outside[0, :] * nsres
+    z[-1, :] -= outside[-1, :] * nsres
+    z[:, 0] -= outside[:, 0] * ewres
+    z[:, -1] -= outside[:, -1] * ewres
+    n = np.pad(np.where(np.isnan(mannings), 1.0, mannings), 1, mode="edge")
+    rain = np.nan_to_num(rain)
+    h = np.zeros(z.shape)
+    res = min(ewres, nsres)
+
+    # longest time step from the velocity at the depth of the rainfall excess
+    speed = np.nanmax(
+        (rain * duration) ** (2.0 / 3.0) * np.sqrt(gradient) / mannings, initial=0.0
+    )
+    longest = duration if speed <= 0 else courant * res / speed
+
+    time = 0.0
+    while time < duration:
+        surface = z + h
+        east, east_drop, east_velocity = face_discharge(surface, z, n, 1, ewres)
+        south, south_drop, south_velocity = face_discharge(surface, z, n, 0, nsres)
+
+        # time step limited by the courant number
+        speed = max(east_velocity.max(), south_velocity.max())
+        dt = min(duration - time, longest)
+        if speed > 0:
+            dt = min(dt, courant * res / speed)
+
+        # keep water surfaces from overshooting each other
+        east = np.clip(
+            east, -east_drop * ewres / (4.0 * dt), east_drop * ewres / (4.0 * dt)
+        )
+        south = np.clip(
+            south, -south_drop * nsres / (4.0 * dt), south_drop * nsres / (4.0 * dt)
+        )
+
+        # change in depth from the rainfall excess and the net inflow
+        change = np.zeros(h.shape)
+        change[:, :-1] -= east / ewres
+        change[:, 1:] += east / ewres
+        change[:-1, :] -= south / nsres
+        change[1:, :] += south / nsres
+        h[1:-1, 1:-1] = np.clip(
+            h[1:-1, 1:-1] + dt * (rain + change[1:-1, 1:-1]), 0.0, None
+        )
+        time = time + dt
+
+    # keep null cells null
+    depth = h[1:-1, 1:-1]
+    depth[np.isnan(elevation)] = np.nan
+
+    return depth
+
+
+def face_discharge(surface, bed, mannings, axis, cellsize):
+    """discharge per unit width (m^2/s) of manning's equation,
+    drop in the water surface (m), and velocity (m/s)
+    across the faces between neighboring cells along an axis,
+    with positive discharge toward the cells with higher indices
+    and no discharge across the faces of null cells"""
+
+    first = tuple(slice(None, -1) if dim == axis else slice(None) for dim in (0, 1))
+    second = tuple(slice(1, None) if dim == axis else slice(None) for dim in (0, 1))
+    drop = surface[first] - surface[second]
+
+    # depth of water above the higher bed of the face
+    depth = np.clip(
+        np.fmax(surface[first], surface[second]) - np.fmax(bed[first], bed[second]),
+        0.0,
+        None,
+    )
+    velocity = (
+        depth ** (2.0 / 3.0)
+        * np.sqrt(np.abs(drop) / cellsize)
+        / ((mannings[first] + mannings[second]) / 2.0)
+    )
+
+    return (
+        np.nan_to_num(np.sign(drop) * depth * velocity),
+        np.nan_to_num(np.abs(drop)),
+        np.nan_to_num(velocity),
+    )
+
+
+def kinematic_depth(rain, accumulation, gradient, mannings, ewres, nsres, duration):
+    """water depth (m) of steady overland flow as a kinematic wave
+    of the rainfall excess (m/s) over the cells draining to each cell,
+    up to the depth of the rainfall excess over a duration (s)"""
+
+    discharge = rain * accumulation * ewres * nsres / math.sqrt(ewres * nsres)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        steady = (discharge * mannings / np.sqrt(gradient)) ** 0.6
+
+    return np.fmin(steady, rain * duration)
+
+
+def hydraulic_diffusivity(depth, speed, gradient):
+    """diffusivity (m^2/s) of overland flow as a diffusive wave
+    from its mean discharge per unit width over twice its mean slope
+    (Hayami 1951)"""
+
+    slope = np.nanmean(gradient)
+    if not slope > 0:
+        return 0.0
+
+    return float(np.nanmean(depth * speed) / (2.0 * slope))
+
+
+def path_sampling(
+    source, east, south, ewres, nsres, duration, walkers, seed, diffusion, decay=None
+):
+    """monte carlo path sampling of walkers released by a source
+    in proportion to its rate that drift with a velocity field,
+    diffuse with a diffusivity (m^2/s),
+    and optionally decay at a rate (1/s) over a duration (s),
+    moving all walkers at once as arrays in time steps
+    of a quarter of a cell at the mean velocity as in r.sim.water
+
+    returns the quantity held in each cell at the end of the duration
+    as the source rate times the residence time of the walkers"""
+
+    rows, cols = source.shape
+    cells = rows * cols
+    residence = np.zeros(cells)
+    rates = np.nan_to_num(np.clip(source, 0.0, None)).ravel()
+    total = rates.sum()
+    if total <= 0 or walkers < 1:
+        return residence.reshape(rows, cols)
+
+    # release the walkers at random positions in the cells of the source
+    rng = np.random.default_rng(seed)
+    start = rng.choice(cells, size=walkers, p=rates / total)
+    row = start // cols + rng.random(walkers)
+    col = start % cols + rng.random(walkers)
+    weight = np.full(walkers, total / walkers)
+
+    # time step of the walkers from the mean velocity
+    east = east.ravel()
+    south = south.ravel()
+    decay = None if decay is None else decay.ravel()
+    speed = np.nanmean(np.hypot(east, south))
+    dt = duration
+    if speed > 0:
+        dt = min(dt, 0.25 * math.sqrt(ewres * nsres) / speed)
+    steps = max(1, math.ceil(duration / dt))
+    dt = duration / steps
+    spread = math.sqrt(2.0 * diffusion * dt)
+
+    for step in range(steps):
+        # remove walkers that leave the region or reach null cells
+        r = np.floor(row).astype(np.int64)
+        c = np.floor(col).astype(np.int64)
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        cell = r[inside] * cols + c[inside]
+        valid = ~np.isnan(east[cell])
+        cell = cell[valid]
+        row = row[inside][valid]
+        col = col[inside][valid]
+        weight = weight[inside][valid]
+        if not cell.size:
+            break
+
+        # accumulate residence time and move the walkers
+        residence += np.bincount(cell, weights=weight * dt, minlength=cells)
+        if decay is not None:
+            weight = weight * np.exp(-decay[cell] * dt)
+        col = col + (east[cell] * dt + spread * rng.standard_normal(cell.size)) / ewres
+        row = row + (south[cell] * dt + spread * rng.standard_normal(cell.size)) / nsres
+
+    residence[np.isnan(east)] = np.nan
+
+    return residence.reshape(rows, cols)
+
+
+def parallel_path_sampling(
+    source,
+    east,
+    south,
+    ewres,
+    nsres,
+    duration,
+    walkers,
+    seed,
+    processes,
+    diffusion,
+    decay=None,
+):
+    """path sampling with the walkers split into batches
+    with independent random streams run in a process pool,
+    combining the batches weighted by their walkers"""
+
+    batches = max(1, min(processes, walkers))
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+    counts = [
+        walkers // batches + (batch < walkers % batches) for batch in range(batches)
+    ]
+    args = (source, east, south, ewres, nsres, duration)
+    if batches == 1:
+        return path_sampling(*args, walkers, seeds[0], diffusion, decay=decay)
+
+    pool = process_pool(processes)
+    jobs = [
+        pool.submit(path_sampling, *args, count, batch_seed, diffusion, decay=decay)
+        for count, batch_seed in zip(counts, seeds)
+    ]
+
+    return sum(job.result() * count for job, count in zip(jobs, counts)) / walkers
+
+
+def half_sample_error(a, b):
+    """relative error of the mean of two half-samples from their difference"""
+
+    total = np.nansum((a + b) ** 2)
+
+    return math.sqrt(np.nansum((a - b) ** 2) / total) if total else None
+
+
+def output_time(time, start):
+    """date of an output time in minutes since the start
+    or in year-month-day hour:minute:second format"""
+
+    try:
+        minutes = float(time)
+    except ValueError:
+        return datetime.datetime.strptime(time.strip(), "%Y-%m-%d %H:%M:%S")
+
+    return datetime.datetime.strptime(start, "%Y-%m-%d %H:%M:%S") + datetime.timedelta(
+        minutes=minutes
+    )
+
+
+def lookahead(iterable):
+    """iterate over the items of an iterable
+    along with whether each item is the last"""
+
+    iterator = iter(iterable)
+    end = object()
+    item = next(iterator, end)
+    while item is not end:
+        following = next(iterator, end)
+        yield item, following is end
+        item = following
+
 
 def cleanup():
     try:
-        # remove temporary maps
-        gscript.run_command(
-            "g.remove",
-            type="raster",
-            name=[
-                "runoff",
-                "mannings",
-                "detachment",
-                "transport",
-                "shearstress",
-                "mass",
-                "density",
-                "sigma",
-                "rain_excess",
-                "rain",
-                "sedflow",
-                "flux",
-                "erdep",
-                "c_factor",
-                "k_factor",
-                "settled_elevation",
-                "depressionless_elevation",
-                "flow_direction",
-                "flowacc",
-                "divergence",
-                "rain_energy",
-                "rain_volume",
-                "rain_intensity",
-                "erosivity",
-                "r_factor",
-                "ls_factor",
-                "dx",
-                "dy",
-                "dxx",
-                "dyy",
-                "qsx",
-                "qsy",
-                "qsxdx",
-                "qsydy",
-                "slope",
-                "aspect",
-            ],
-            flags="f",
-        )
+        # remove the temporary maps of this run
+        if temporary.names:
+            gscript.run_command(
+                "g.remove", type="raster", name=sorted(temporary.names), flags="f"
+            )
 
     except CalledModuleError:
         pass
@@ -0,0 +1,658 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:    Brendan Harmon <brendan.harmon@gmail.com>
+
+PURPOSE:   Benchmark the dynamic landscape evolution model
+           on reproducible synthetic terrain
+
+COPYRIGHT: (C) 2017 Brendan Harmon
+
+LICENSE:   This program is free software under the GNU General Public
+           License (>=v2).
+
+USAGE:     python scripts/benchmark.py [--sizes 256 512] [--modes rusle_mode]
+           Run inside a GRASS session in a scratch mapset
+           to benchmark the model with GRASS,
+           or anywhere else to benchmark the array backend
+           against a local stand-in for GRASS,
+           with the SIMWE mode benchmarked by in-process path sampling.
+"""
+
+import os
+import datetime
+import re
+import sys
+import json
+import types
+import argparse
+import resource
+import tempfile
+import importlib.util
+import multiprocessing
+import concurrent.futures
+import timeit
+import numpy as np
+
+# path to the model
+model = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'r.sim.terrain.py')
+
+# benchmark defaults
+sizes = [256, 512, 1024, 2048, 4096, 8192]
+terrains = ['fractal', 'channels']
+modes = ['simwe_mode', 'usped_mode', 'rusle_mode']
+steps = 10
+seed = 1
+
+# names of the maps of the benchmark
+elevation = 'benchmark_elevation'
+elevation_timeseries = 'benchmark_elevation_timeseries'
+difference_timeseries = 'benchmark_difference_timeseries'
+
+# model parameters
+params = {
+    'runoff': 0.35,
+    'mannings': 0.04,
+    'detachment': 0.01,
+    'transport': 0.01,
+    'shearstress': 0.0,
+    'density': 1400.0,  # kg/m^3
+    'mass': 116.0,
+    'k_factor': 0.25,
+    'c_factor': 0.1}
+exponents = {
+    'simwe_mode': (1.0, 1.0),
+    'usped_mode': (1.5, 1.2),
+    'rusle_mode': (0.4, 1.3)}
+
+
+def main():
+    """generate synthetic terrain and benchmark each mode"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split('PURPOSE:')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=sizes,
+        help='number of rows and columns of the synthetic terrain')
+    parser.add_argument('--terrains', nargs='+', default=terrains,
+        choices=terrains, help='synthetic terrain')
+    parser.add_argument('--modes', nargs='+', default=modes,
+        choices=modes, help='model modes')
+    parser.add_argument('--steps', type=int, default=steps,
+        help='number of time steps')
+    parser.add_argument('--seed', type=int, default=seed,
+        help='seed of the synthetic terrain')
+    parser.add_argument('--backend', default='array',
+        choices=['raster', 'array'], help='model backend')
+    parser.add_argument('--accumulation', default='incremental',
+        choices=['watershed', 'incremental'], help='flow accumulation')
+    parser.add_argument('--fill-method', default='priority_flood',
+        choices=['fill_dir', 'priority_flood'], help='depression filling')
+    parser.add_argument('--max-change', type=float,
+        help='maximum change in elevation per adaptive time step')
+    parser.add_argument('--tile-size', type=int, default=0,
+        help='number of rows and columns of the tiles computed in parallel')
+    parser.add_argument('--threads', type=int, default=1,
+        help='number of processes for the tiles')
+    parser.add_argument('--precision', default='double',
+        choices=['double', 'float'], help='precision of the written maps')
+    parser.add_argument('--output-stride', type=int, default=1,
+        help='write the maps of every nth step and check their differences')
+    parser.add_argument('--write-queue', type=int, default=0,
+        help='number of maps queued for the background writer')
+    parser.add_argument('--hydrology', default='modules',
+        choices=['modules', 'path_sampling', 'diffusive_wave'],
+        help='solver of the hydrologic simulation of simwe_mode')
+    parser.add_argument('--stand-in', action='store_true',
+        help='use the local stand-in for GRASS even if GRASS is available')
+    parser.add_argument('--output',
+        help='json file with the results of the benchmark')
+    args = parser.parse_args()
+
+    # use the local stand-in without a GRASS session
+    stand_in = args.stand_in or not grass_session()
+    if stand_in:
+        args.backend = 'array'
+        args.accumulation = 'incremental'
+        args.fill_method = 'priority_flood'
+
+    # run each case in a new process to measure its peak memory
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print('{:<10} {:>6} {:<11} {:>6} {:>9} {:>8} {:>9}  {}'.format(
+        'terrain', 'size', 'mode', 'steps', 'seconds', 'steps/s',
+        'rss (MB)', 'seconds per step by stage'))
+    for size in args.sizes:
+        for terrain in args.terrains:
+            for mode in args.modes:
+                case = dict(
+                    terrain=terrain,
+                    size=size,
+                    mode=mode,
+                    steps=args.steps,
+                    seed=args.seed,
+                    backend=args.backend,
+                    accumulation=args.accumulation,
+                    fill_method=args.fill_method,
+                    max_change=args.max_change,
+                    tile_size=args.tile_size,
+                    threads=args.threads,
+                    precision=args.precision,
+                    output_stride=args.output_stride,
+                    write_queue=args.write_queue,
+                    hydrology=args.hydrology,
+                    stand_in=stand_in)
+                # with a process that is not a daemon to start tiles
+                with concurrent.futures.ProcessPoolExecutor(1,
+                        mp_context=context) as pool:
+                    result = pool.submit(benchmark, case).result()
+                results.append(result)
+                report(result)
+
+    # write results
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+def grass_session():
+    """check whether this runs inside a GRASS session"""
+    if 'GISRC' not in os.environ:
+        return False
+    try:
+        import grass.script
+    except ImportError:
+        return False
+    return True
+
+
+def benchmark(case):
+    """run a single mode on synthetic terrain
+    and measure the time of each step and stage and the peak memory"""
+
+    result = dict(case)
+    with tempfile.TemporaryDirectory() as directory:
+        size = case['size']
+
+        # load the model with GRASS or with the local stand-in
+        if case['stand_in']:
+            LocalGrass(os.path.join(directory, 'location', 'mapset'),
+                size, size).install()
+        terrain = load_model()
+        gscript = terrain.gscript
+
+        # skip hydrologic simulations that need GRASS
+        if (case['stand_in'] and case['mode'] == 'simwe_mode'
+                and case['hydrology'] != 'path_sampling'):
+            result['skipped'] = ('r.sim.water and r.sim.sediment '
+                'are not available in the stand-in')
+            return result
+
+        # set region and write synthetic terrain and parameters
+        gscript.run_command('g.region', n=size, s=0, e=size, w=0, res=1)
+        if case['terrain'] == 'fractal':
+            dem = diamond_square(size, seed=case['seed'])
+        else:
+            dem = tilted_plane(size, seed=case['seed'])
+        array = terrain.garray.array()
+        array[...] = dem
+        array.write(elevation, overwrite=True)
+        del array
+
+        # check that tiles give the same results as the whole region
+        if case['tile_size']:
+            check_tiles(terrain, dem, case['tile_size'], case['threads'])
+            result['tiles'] = 'match'
+        del dem
+        for name, value in params.items():
+            gscript.mapcalc('{name} = {value}'.format(
+                name=name, value=value), overwrite=True)
+
+        # compare the in-process hydrology with r.sim.water
+        if (case['mode'] == 'simwe_mode' and case['hydrology'] != 'modules'
+                and not case['stand_in']):
+            result['agreement'] = hydrology_agreement(terrain,
+                case['hydrology'], case['threads'])
+
+        # profile the stages of each step
+        terrain.profiler.start(os.path.join(directory, 'profile.json'))
+
+        # write and register maps in the background
+        terrain.writer.start(case['write_queue'])
+
+        # run the model with the arguments of r.sim.terrain
+        # as strings like the options parsed from the command line
+        m, n = exponents[case['mode']]
+        dynamics = terrain.DynamicEvolution(
+            elevation=elevation,
+            mode=case['mode'],
+            precipitation=None,
+            start='2016-01-01 00:00:00',
+            rain_intensity=50.0,
+            rain_duration=str(3 * case['steps']),
+            rain_interval='3',
+            temporaltype='absolute',
+            elevation_timeseries=elevation_timeseries,
+            elevation_title='Benchmark elevation',
+            elevation_description='Benchmark of evolved elevation',
+            depth_timeseries=None,
+            depth_title=None,
+            depth_description=None,
+            erdep_timeseries=None,
+            erdep_title=None,
+            erdep_description=None,
+            flux_timeseries=None,
+            flux_title=None,
+            flux_description=None,
+            difference_timeseries=(difference_timeseries
+                if case['output_stride'] > 1 else None),
+            difference_title='Benchmark difference',
+            difference_description='Benchmark of elevation change',
+            walkers='100000',
+            runoff='runoff',
+            mannings='mannings',
+            detachment='detachment',
+            transport='transport',
+            shearstress='shearstress',
+            density='density',
+            mass='mass',
+            grav_diffusion='0.1',
+            erdepmin='-0.5',
+            erdepmax='0.5',
+            k_factor='k_factor',
+            c_factor='c_factor',
+            m=str(m),
+            n=str(n),
+            threads=str(case['threads']),
+            fill_depressions=True,
+            backend=case['backend'],
+            edges='center',
+            laplacian='nine_point',
+            fill_method=case['fill_method'],
+            fill_epsilon=0.0,
+            accumulation=case['accumulation'],
+            register_batch=0,
+            checkpoint=None,
+            checkpoint_interval=100,
+            resume=False,
+            rain_threshold=None,
+            max_change=case['max_change'],
+            tile_size=case['tile_size'],
+            run_id=None,
+            output_stride=case['output_stride'],
+            output_times=[],
+            precision=case['precision'],
+            quantum=None,
+            hydrology_tolerance=None,
+            walker_error=None,
+            hydrology=case['hydrology'])
+        start = timeit.default_timer()
+        dynamics.rainfall_event()
+        terrain.writer.stop()
+        seconds = timeit.default_timer() - start
+
+        # check that the differences of the written steps add up
+        if case['output_stride'] > 1:
+            check_differences(terrain, case['steps'], case['output_stride'])
+            result['differences'] = 'match'
+
+        # stop the processes of the tiles and of path sampling
+        # so that this process can exit
+        if case['tile_size'] or case['hydrology'] == 'path_sampling':
+            terrain.process_pool(case['threads']).shutdown()
+
+        # summarize the profile
+        stages = {}
+        for step in terrain.profiler.steps:
+            for stage, stage_seconds in step['stages'].items():
+                stages[stage] = stages.get(stage, 0.0) + stage_seconds
+        result['seconds'] = seconds
+        result['steps_per_second'] = case['steps'] / seconds
+        result['stages'] = {
+            stage: stage_seconds / case['steps']
+            for stage, stage_seconds in stages.items()}
+        result['bytes'] = sum(step['bytes'] for step in terrain.profiler.steps)
+
+        # remove maps
+        if not case['stand_in']:
+            gscript.run_command('t.remove', inputs=elevation_timeseries,
+                flags='rf')
+            if case['output_stride'] > 1:
+                gscript.run_command('t.remove', inputs=difference_timeseries,
+                    flags='rf')
+            gscript.run_command('g.remove', type='raster',
+                name=list(params) + ['net_difference'], flags='f')
+            terrain.cleanup()
+
+    # peak resident set size in megabytes
+    result['peak_rss'] = resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return result
+
+
+def check_tiles(terrain, dem, size, threads):
+    """check that the flow accumulation and depression filling
+    computed in tiles match those of the whole region
+    for the terrain and for a flat grid without flow between tiles"""
+    pool = terrain.process_pool(threads)
+    for name, grid in [('terrain', dem), ('flat', np.zeros_like(dem))]:
+        stages = [
+            ('flow accumulation',
+                terrain.tiled_accumulation(grid, 1.0, 1.0, size, pool),
+                terrain.FlowAccumulation(1.0, 1.0).update(grid)),
+            ('depression filling',
+                terrain.tiled_priority_flood(grid, size, pool),
+                terrain.priority_flood(grid))]
+        for stage, tiled, whole in stages:
+            if not np.allclose(tiled, whole, equal_nan=True):
+                raise ValueError('the {stage} of tiles of {size} cells '
+                    'does not match the whole {name}'.format(
+                        stage=stage, size=size, name=name))
+
+
+def check_differences(terrain, steps, stride):
+    """check that the difference maps of every nth step and the last step
+    add up to the net difference of the run"""
+    start = datetime.datetime(2016, 1, 1)
+    total = 0.0
+    for step in range(1, steps + 1):
+        if step % stride and step != steps:
+            continue
+        time = start + datetime.timedelta(minutes=3 * step)
+        total = total + terrain.read_array(
+            time.strftime('difference_%Y_%m_%d_%H_%M_%S'))
+    net = terrain.read_array('net_difference')
+    if not np.allclose(total, net, atol=1e-9, equal_nan=True):
+        raise ValueError('the differences of every {stride} steps '
+            'do not add up to the net difference'.format(stride=stride))
+
+
+def hydrology_agreement(terrain, hydrology, threads):
+    """time the water depth of a rainfall interval
+    simulated by r.sim.water and by in-process path sampling
+    or the diffusive wave model on the initial terrain
+    and measure their relative difference"""
+    gscript = terrain.gscript
+    region = gscript.region()
+    dem = terrain.read_array(elevation)
+    dx, dy = terrain.partial_derivatives(dem, region['ewres'], region['nsres'])
+    terrain.write_array(dx, 'benchmark_dx')
+    terrain.write_array(dy, 'benchmark_dy')
+    gscript.mapcalc('benchmark_rain = 50.0*runoff', overwrite=True)
+
+    # path sampling with r.sim.water
+    start = timeit.default_timer()
+    gscript.run_command('r.sim.water',
+        elevation=elevation,
+        dx='benchmark_dx',
+        dy='benchmark_dy',
+        rain='benchmark_rain',
+        man='mannings',
+        depth='benchmark_depth',
+        nwalkers=100000,
+        niterations=3,
+        nprocs=threads,
+        overwrite=True)
+    simwe_seconds = timeit.default_timer() - start
+    simwe = terrain.read_array('benchmark_depth')
+
+    # in-process path sampling or diffusive wave model
+    # as in the array backend
+    start = timeit.default_timer()
+    ewres, nsres = region['ewres'], region['nsres']
+    rain = np.full(dem.shape, 50.0 * params['runoff'] / 1000.0 / 3600.0)
+    mannings = np.full(dem.shape, params['mannings'])
+    gradient = np.hypot(dx, dy)
+    if hydrology == 'path_sampling':
+        excess = terrain.kinematic_depth(rain,
+            terrain.FlowAccumulation(ewres, nsres).update(dem),
+            gradient, mannings, ewres, nsres, 3 * 60.0)
+        east, south, speed = terrain.overland_velocity(dx, dy, mannings,
+            excess)
+        volume = terrain.parallel_path_sampling(rain * ewres * nsres,
+            east, south, ewres, nsres, 3 * 60.0, 100000, 1, threads,
+            terrain.hydraulic_diffusivity(excess, speed, gradient))
+        depth = volume / (ewres * nsres)
+    else:
+        depth = terrain.diffusive_wave(dem, gradient, rain, mannings,
+            ewres, nsres, 3 * 60.0)
+    hydrology_seconds = timeit.default_timer() - start
+
+    gscript.run_command('g.remove', type='raster',
+        name=['benchmark_dx', 'benchmark_dy', 'benchmark_rain',
+            'benchmark_depth'], flags='f')
+    return {
+        'simwe_seconds': simwe_seconds,
+        'hydrology_seconds': hydrology_seconds,
+        'relative_difference': float(np.sqrt(
+            np.nansum((depth - simwe) ** 2) / np.nansum(simwe ** 2)))}
+
+
+def report(result):
+    """print the results of a case"""
+    if 'skipped' in result:
+        print('{terrain:<10} {size:>6} {mode:<11} skipped: {skipped}'.format(
+            **result))
+        return
+    summary = ' '.join('{stage}={seconds:.3f}'.format(
+        stage=stage, seconds=seconds)
+        for stage, seconds in sorted(result['stages'].items(),
+            key=lambda item: -item[1]))
+    print('{terrain:<10} {size:>6} {mode:<11} {steps:>6} {seconds:>9.2f} '
+        '{steps_per_second:>8.2f} {peak_rss:>9.1f}  {summary}'.format(
+            summary=summary, **result))
+    if 'agreement' in result:
+        print('{:<10} {:>6} {:<11} r.sim.water {simwe_seconds:.3f} s, '
+            '{hydrology} {hydrology_seconds:.3f} s, '
+            'relative difference {relative_difference:.3f}'.format(
+                '', '', '', hydrology=result['hydrology'],
+                **result['agreement']))
+    sys.stdout.flush()
+
+
+def load_model():
+    """import r.sim.terrain as a module"""
+    spec = importlib.util.spec_from_file_location('r_sim_terrain', model)
+    terrain = importlib.util.module_from_spec(spec)
+
+    # register the module so that tiles can be sent to worker processes
+    sys.modules[spec.name] = terrain
+    spec.loader.exec_module(terrain)
+    return terrain
+
+
+def diamond_square(size, roughness=0.9, relief=50.0, seed=1):
+    """fractal terrain generated with the diamond-square algorithm"""
+    rng = np.random.default_rng(seed)
+    n = 1
+    while n < size - 1:
+        n = n * 2
+    z = np.zeros((n + 1, n + 1))
+    z[::n, ::n] = rng.uniform(-1.0, 1.0, (2, 2))
+    step = n
+    scale = 1.0
+    while step > 1:
+        half = step // 2
+
+        # diamond step: centers of the squares
+        z[half::step, half::step] = (
+            z[:-1:step, :-1:step] + z[step::step, :-1:step]
+            + z[:-1:step, step::step] + z[step::step, step::step]
+            ) / 4.0 + rng.uniform(-scale, scale, (n // step, n // step))
+
+        # square step: midpoints of the edges of the squares
+        padded = np.pad(z, half, constant_values=np.nan)
+        for row, col in [(0, half), (half, 0)]:
+            rows = len(range(row, n + 1, step))
+            cols = len(range(col, n + 1, step))
+
+            def shifted(drow, dcol):
+                r = row + half + drow
+                c = col + half + dcol
+                return padded[r:r + rows * step:step, c:c + cols * step:step]
+
+            neighbors = np.stack([shifted(-half, 0), shifted(half, 0),
+                shifted(0, -half), shifted(0, half)])
+            z[row::step, col::step] = np.nanmean(neighbors, axis=0) \
+                + rng.uniform(-scale, scale, (rows, cols))
+        scale = scale * 2.0 ** -roughness
+        step = half
+
+    # scale to relief
+    z = z[:size, :size]
+    return (z - z.min()) / (z.max() - z.min()) * relief
+
+
+def tilted_plane(size, slope=0.05, channels=8, depth=2.0, seed=1):
+    """plane tilted to the south with meandering channels
+    and a little noise"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:size, 0:size].astype(np.float64)
+    z = slope * (size - rows)
+    spacing = size / float(channels)
+    width = spacing / 8.0
+    for channel in range(channels):
+        center = (channel + 0.5) * spacing + spacing / 4.0 * np.sin(
+            rows / size * 2.0 * np.pi * rng.uniform(1.0, 3.0)
+            + rng.uniform(0.0, 2.0 * np.pi))
+        z = z - depth * np.exp(-((cols - center) / width) ** 2)
+    return z + rng.normal(0.0, 0.01, z.shape)
+
+
+class LocalGrass:
+    """local stand-in for the parts of GRASS used by the array backend
+    that stores rasters as numpy files in the fcell element
+    of a temporary mapset"""
+
+    def __init__(self, mapset, rows, cols, res=1.0):
+        self.mapset = mapset
+        self.rows = rows
+        self.cols = cols
+        self.res = res
+        os.makedirs(os.path.join(mapset, 'fcell'))
+
+    def path(self, name):
+        return os.path.join(self.mapset, 'fcell', name)
+
+    def read(self, name):
+        return np.load(self.path(name))
+
+    def write(self, name, array):
+        array = np.asarray(array)
+        if array.dtype.kind not in 'fi':
+            array = array.astype(np.float64)
+        with open(self.path(name), 'wb') as output:
+            np.save(output, np.broadcast_to(array, (self.rows, self.cols)))
+
+    def region(self, **kwargs):
+        return {
+            'rows': self.rows,
+            'cols': self.cols,
+            'ewres': self.res,
+            'nsres': self.res,
+            'n': self.rows * self.res,
+            's': 0.0,
+            'e': self.cols * self.res,
+            'w': 0.0}
+
+    def run_command(self, module, **kwargs):
+        if module == 'g.remove':
+            names = kwargs['name']
+            if isinstance(names, str):
+                names = names.split(',')
+            for name in names:
+                if os.path.exists(self.path(name)):
+                    os.remove(self.path(name))
+        elif module == 'g.rename':
+            old, new = kwargs['raster'].split(',')
+            os.replace(self.path(old), self.path(new))
+        elif module not in ['g.region', 'r.colors', 'r.timestamp',
+                't.create', 't.register']:
+            raise self.CalledModuleError(
+                '{module} is not available in the local stand-in'.format(
+                    module=module))
+        return 0
+
+    def write_command(self, module, **kwargs):
+        return self.run_command(module, **kwargs)
+
+    def parse_command(self, module, **kwargs):
+        if module == 'g.region':
+            return {key: str(value) for key, value in self.region().items()}
+        return self.run_command(module, **kwargs)
+
+    def mapcalc(self, expression, **kwargs):
+        """evaluate an arithmetic map algebra expression of named maps"""
+        name, expression = expression.split('=', 1)
+        maps = {
+            raster: self.read(raster)
+            for raster in re.findall(r'[A-Za-z_]\w*', expression)
+            if os.path.exists(self.path(raster))}
+        self.write(name.strip(), eval(expression, {'__builtins__': {}}, maps))
+
+    def gisenv(self):
+        location = os.path.dirname(self.mapset)
+        return {
+            'GISDBASE': os.path.dirname(location),
+            'LOCATION_NAME': os.path.basename(location),
+            'MAPSET': os.path.basename(self.mapset)}
+
+    def tempfile(self):
+        handle, path = tempfile.mkstemp(dir=self.mapset)
+        os.close(handle)
+        return path
+
+    def try_remove(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def fatal(self, message):
+        sys.exit(message)
+
+    def warning(self, message):
+        sys.stderr.write('WARNING: {message}\n'.format(message=message))
+
+    def install(self):
+        """install the stand-in as the grass package"""
+        local = self
+
+        class CalledModuleError(Exception):
+            pass
+
+        class array(np.ndarray):
+            def __new__(cls, dtype=np.float64):
+                return np.zeros((local.rows, local.cols), dtype).view(cls)
+
+            def read(self, name, null=None):
+                self[...] = local.read(name)
+                return 0
+
+            def write(self, name, null=None, overwrite=False):
+                local.write(name, self)
+                return 0
+
+        self.CalledModuleError = CalledModuleError
+        grass = types.ModuleType('grass')
+        script = types.ModuleType('grass.script')
+        exceptions = types.ModuleType('grass.exceptions')
+        garray = types.ModuleType('grass.script.array')
+        for function in ['region', 'run_command', 'write_command',
+                'parse_command', 'mapcalc', 'gisenv', 'tempfile',
+                'try_remove', 'fatal', 'warning']:
+            setattr(script, function, getattr(self, function))
+        script.read_command = self.run_command
+        script.array = garray
+        garray.array = array
+        exceptions.CalledModuleError = CalledModuleError
+        grass.script = script
+        grass.exceptions = exceptions
+        sys.modules.update({
+            'grass': grass,
+            'grass.script': script,
+            'grass.script.array': garray,
+            'grass.exceptions': exceptions})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+AUTHOR:    Brendan Harmon <brendan.harmon@gmail.com>
+
+PURPOSE:   Run an ensemble of landscape evolution simulations in parallel
+           from a grid of parameters or a file of sampled parameters
+
+COPYRIGHT: (C) 2017 Brendan Harmon
+
+LICENSE:   This program is free software under the GNU General Public
+           License (>=v2).
+
+USAGE:     python scripts/ensemble.py --grid grid.json --region elevation
+           python scripts/ensemble.py --samples samples.csv --region elevation
+           Run inside a GRASS session. Each simulation runs in its own mapset
+           with the parameters of r.sim.terrain,
+           reading shared inputs such as name@PERMANENT without copying them,
+           or with --mapset all simulations share a mapset
+           with their maps prefixed by their run identifiers,
+           and the status and time of each simulation
+           are written to a results table.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import datetime
+import itertools
+import concurrent.futures
+import grass.script as gscript
+
+# columns of the results table
+columns = ['run', 'mapset', 'status', 'attempts', 'threads',
+    'start', 'end', 'seconds', 'error']
+
+
+def main():
+    """create mapsets and environments for a grid or sample of parameters
+    and then run the simulations in parallel"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split('PURPOSE:')[0])
+    runs = parser.add_mutually_exclusive_group(required=True)
+    runs.add_argument('--grid',
+        help='json file with a list of values for each parameter')
+    runs.add_argument('--samples',
+        help='csv or json file with the parameters of each simulation')
+    parser.add_argument('--region', required=True,
+        help='raster map with the region of the simulations')
+    parser.add_argument('--res', type=float,
+        help='resolution of the region')
+    parser.add_argument('--prefix', default='ensemble',
+        help='prefix of the mapsets or run identifiers of the simulations')
+    parser.add_argument('--mapset',
+        help='mapset shared by all simulations, '
+        'with the maps of each simulation prefixed by its run identifier')
+    parser.add_argument('--nprocs', type=int, default=1,
+        help='number of simulations run at once')
+    parser.add_argument('--threads', type=int, default=1,
+        help='number of threads of each simulation')
+    parser.add_argument('--retries', type=int, default=1,
+        help='number of times a failed simulation is run again')
+    parser.add_argument('--results', default='results.csv',
+        help='csv file with the status and time of each simulation')
+    args = parser.parse_args()
+
+    # read the parameters of each simulation
+    if args.grid:
+        with open(args.grid) as grid:
+            options_list = expand_grid(json.load(grid))
+    else:
+        options_list = read_samples(args.samples)
+
+    # create mapsets and environments
+    # with the inputs read from the mapsets they are in
+    if args.mapset:
+        shared = create_environment(args.mapset, args.region, args.res)
+    for index, params in enumerate(options_list):
+        run = '{prefix}_{index}'.format(prefix=args.prefix, index=index)
+        params.setdefault('elevation', args.region)
+        if args.mapset:
+            # prefix the maps and space time datasets of each simulation
+            params['mapset'] = args.mapset
+            params.setdefault('run_id', run)
+            params.setdefault('elevation_timeseries', 'elevation_timeseries')
+            for name in list(params):
+                if name.endswith('_timeseries'):
+                    params[name] = '{run}_{timeseries}'.format(
+                        run=params['run_id'], timeseries=params[name])
+            params['env'] = shared
+        else:
+            mapset = params.get('mapset') or run
+            params['mapset'] = mapset
+            params['env'] = create_environment(mapset, args.region, args.res)
+
+    # run simulations in parallel
+    results = parallel_simulations(options_list,
+        nprocs=args.nprocs,
+        threads=args.threads,
+        retries=args.retries,
+        results=args.results)
+    failed = [result for result in results if result['status'] != 'done']
+    return 1 if failed else 0
+
+
+def expand_grid(grid):
+    """list of the parameters of each simulation
+    for every combination of the values in a grid of parameters"""
+    names = list(grid)
+    values = [value if isinstance(value, list) else [value]
+        for value in grid.values()]
+    return [dict(zip(names, combination))
+        for combination in itertools.product(*values)]
+
+
+def read_samples(samples):
+    """list of the parameters of each simulation
+    from the rows of a csv file or the objects of a json file,
+    skipping empty values"""
+    with open(samples) as sample_file:
+        if samples.endswith('.json'):
+            rows = json.load(sample_file)
+        else:
+            rows = list(csv.DictReader(sample_file))
+    return [{name: value for name, value in row.items()
+        if value not in ('', None)} for row in rows]
+
+
+def create_environment(mapset, region, res=None):
+    """create a mapset with an environment for a simulation
+    that reads its inputs from the mapsets they are in,
+    such as name@PERMANENT, instead of copies in its own mapset"""
+
+    # create mapset
+    env = gscript.gisenv()
+    gscript.read_command('g.mapset',
+        mapset=mapset,
+        location=env['LOCATION_NAME'],
+        flags='c')
+
+    # create env
+    tmp_gisrc_file, env = getEnvironment(env['GISDBASE'],
+        env['LOCATION_NAME'], mapset, region, res)
+    return env
+
+
+def getEnvironment(gisdbase, location, mapset, region, res=None):
+    """Creates an environment to be passed in run_command.
+    Returns a tuple with a temporary file path and an environment.
+    The user should delete this temporary file."""
+    tmp_gisrc_file = gscript.tempfile()
+    with open(tmp_gisrc_file, 'w') as f:
+        f.write('MAPSET: {mapset}\n'.format(mapset=mapset))
+        f.write('GISDBASE: {g}\n'.format(g=gisdbase))
+        f.write('LOCATION_NAME: {l}\n'.format(l=location))
+        f.write('GUI: text\n')
+    env = os.environ.copy()
+    env['GISRC'] = tmp_gisrc_file
+    if res:
+        env['GRASS_REGION'] = gscript.region_env(raster=region, res=res)
+    else:
+        env['GRASS_REGION'] = gscript.region_env(raster=region)
+    env['GRASS_OVERWRITE'] = '1'
+    env['GRASS_VERBOSE'] = '0'
+    env['GRASS_MESSAGE_FORMAT'] = 'standard'
+    return tmp_gisrc_file, env
+
+
+def simulate(params):
+    """run the dynamic landscape evolution model with the given parameters
+    and return its status and time instead of raising errors
+    so that a failed simulation does not stop the others"""
+    params = {name: value for name, value in params.items()
+        if name != 'mapset'}
+    result = {'start': datetime.datetime.now().isoformat(' ', 'seconds')}
+    start = time.time()
+    try:
+        gscript.run_command('r.sim.terrain', **params)
+        result['status'] = 'done'
+        result['error'] = ''
+    except Exception as error:
+        # record any error, whether the module failed or could not be run
+        result['status'] = 'failed'
+        result['error'] = ' '.join('{name}: {error}'.format(
+            name=type(error).__name__, error=error).split())
+    result['seconds'] = round(time.time() - start, 3)
+    result['end'] = datetime.datetime.now().isoformat(' ', 'seconds')
+    return result
+
+
+def parallel_simulations(options_list, nprocs=1, threads=1, retries=0,
+        results=None):
+    """run simulations in parallel with a budget of nprocs times threads
+    threads, starting each simulation when enough threads are free
+    and running failed simulations again up to the number of retries
+
+    returns the status and time of each simulation
+    and writes them to a csv file of results"""
+
+    budget = nprocs * threads
+    table = []
+    for index, params in enumerate(options_list):
+        params.setdefault('threads', threads)
+        table.append({'run': index, 'mapset': params.get('mapset', ''),
+            'status': 'pending', 'attempts': 0,
+            'threads': min(int(params['threads']), budget)})
+    pending = list(range(len(options_list)))
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(budget) as pool:
+        try:
+            while pending or running:
+                # start simulations while there are free threads
+                free = budget - sum(table[index]['threads']
+                    for index in running.values())
+                for index in list(pending):
+                    if table[index]['threads'] > free:
+                        continue
+                    pending.remove(index)
+                    table[index]['attempts'] += 1
+                    table[index]['status'] = 'running'
+                    future = pool.submit(simulate, options_list[index])
+                    running[future] = index
+                    free = free - table[index]['threads']
+
+                # record finished simulations and retry failed ones
+                done, not_done = concurrent.futures.wait(running,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    table[index].update(future.result())
+                    if (table[index]['status'] == 'failed'
+                            and table[index]['attempts'] <= retries):
+                        pending.append(index)
+                    print('run {run} in {mapset}: {status} '
+                        'after {attempts} attempts in {seconds} s'.format(
+                            **table[index]))
+                    sys.stdout.flush()
+                    if results:
+                        write_results(table, results)
+        except KeyboardInterrupt:
+            for future in running:
+                future.cancel()
+            for index in pending + list(running.values()):
+                table[index]['status'] = 'cancelled'
+
+    # write results
+    if results:
+        write_results(table, results)
+    return table
+
+
+def write_results(table, results):
+    """write the status and time of each simulation to a csv file"""
+    with open(results, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=columns,
+            extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(table)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,17 +12,11 @@ LICENSE:   This program is free software under the GNU General Public
            License (>=v2).
 """
 
-import os
 import sys
 import atexit
-from multiprocessing import Pool
 import grass.script as gscript
 from grass.exceptions import CalledModuleError
-
-# set environment
-env = gscript.gisenv()
-gisdbase = env['GISDBASE']
-location = env['LOCATION_NAME']
+from ensemble import create_environment, parallel_simulations
 
 # list of simulations to run
 simulations = ['simwe']
@@ -32,6 +26,7 @@ res = 1  # resolution of the region
 region = 'elevation_2012_1m@PERMANENT'
 nprocs = 1
 threads = 8
+retries = 1
 
 def main():
     """install dependencies, create mapsets and environments,
@@ -48,8 +43,7 @@ def main():
 
     # dictionary of parameters for steady state erosion-deposition simulation
     simwe_params = {}
-    simwe_params['elevation'] = 'elevation@{simulation}'.format(
-        simulation=simulations[0])
+    simwe_params['elevation'] = region
     simwe_params['runs'] = 'event'
     simwe_params['mode'] = 'simwe_mode'
     simwe_params['rain_intensity'] = 50.0
@@ -63,82 +57,36 @@ def main():
     simwe_params['erdepmax'] = 0.5
     simwe_params['detachment_value'] = 0.001
     simwe_params['transport_value'] = 0.001
-    simwe_params['mannings'] = 'mannings'
-    simwe_params['runoff'] = 'runoff'
+    simwe_params['mannings'] = 'mannings@PERMANENT'
+    simwe_params['runoff'] = 'runoff@PERMANENT'
     simwe_params['threads'] = threads
     simwe_params['flags'] = 'f'
+    simwe_params['depth_timeseries'] = 'depth_timeseries'
+    simwe_params['erdep_timeseries'] = 'erdep_timeseries'
+    simwe_params['difference_timeseries'] = 'difference_timeseries'
+    simwe_params['mapset'] = simulations[0]
     simwe_params['env'] = envs['{simulation}'.format(simulation=simulations[0])]
     # append dictionary to options list
     options_list.append(simwe_params)
 
     # run simulations in parallel
-    parallel_simulations(options_list)
+    parallel_simulations(options_list,
+        nprocs=nprocs,
+        threads=threads,
+        retries=retries,
+        results='steady_state_results.csv')
     atexit.register(cleanup)
     sys.exit(0)
 
-def simulate(params):
-    """run the dynamic landscape evolution model with the given parameters"""
-    gscript.run_command('r.sim.terrain', **params)
-
 def create_environments(simulations):
-    """generate environment settings and copy maps"""
-    tmp_gisrc_files = {}
+    """generate environment settings"""
     envs = {}
     for mapset in simulations:
-        # create mapset
-        gscript.read_command('g.mapset',
-            mapset=mapset,
-            location=location,
-            flags='c')
-        # create env
-        tmp_gisrc_file, env = getEnvironment(gisdbase, location, mapset)
-        tmp_gisrc_files[mapset] = tmp_gisrc_file
-        envs[mapset] = env
-        # copy maps
-        gscript.run_command('g.copy',
-            raster=[region,'elevation'],
-            env=envs[mapset])
-        gscript.run_command('g.copy',
-            raster=['mannings@PERMANENT','mannings'],
-            env=envs[mapset])
-        gscript.run_command('g.copy',
-            raster=['runoff@PERMANENT','runoff'],
-            env=envs[mapset])
-        gscript.run_command('g.copy',
-            raster=['c_factor@PERMANENT','c_factor'],
-            env=envs[mapset])
-        gscript.run_command('g.copy',
-            raster=['k_factor@PERMANENT','k_factor'],
-            env=envs[mapset])
+        # create mapset and env
+        # with the inputs read from the PERMANENT mapset
+        envs[mapset] = create_environment(mapset, region, res)
     return envs
 
-def parallel_simulations(options_list):
-    """run simulations in parallel"""
-    pool = Pool(nprocs)
-    p = pool.map_async(simulate, options_list)
-    try:
-        p.get()
-    except (KeyboardInterrupt, CalledModuleError):
-        return
-
-def getEnvironment(gisdbase, location, mapset):
-    """Creates an environment to be passed in run_command.
-    Returns a tuple with a temporary file path and an environment.
-    The user should delete this temporary file."""
-    tmp_gisrc_file = gscript.tempfile()
-    with open(tmp_gisrc_file, 'w') as f:
-        f.write('MAPSET: {mapset}\n'.format(mapset=mapset))
-        f.write('GISDBASE: {g}\n'.format(g=gisdbase))
-        f.write('LOCATION_NAME: {l}\n'.format(l=location))
-        f.write('GUI: text\n')
-    env = os.environ.copy()
-    env['GISRC'] = tmp_gisrc_file
-    env['GRASS_REGION'] = gscript.region_env(raster=region,res=res)
-    env['GRASS_OVERWRITE'] = '1'
-    env['GRASS_VERBOSE'] = '0'
-    env['GRASS_MESSAGE_FORMAT'] = 'standard'
-    return tmp_gisrc_file, env
-
 def dependencies():
     """try to install required add-ons"""
     try: